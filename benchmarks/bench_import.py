@@ -0,0 +1,82 @@
+########################################################################################################################
+# Import-time benchmark
+#
+# Times imports of the plotting packages in fresh interpreters (so nothing is cached in sys.modules) and reports which
+# heavy dependencies each import pulled in. Worker processes and services rely on these staying in the milliseconds.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_import --repeat 10 --max-ms 50
+########################################################################################################################
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib", "scipy", "seaborn")
+
+# Imports that are expected to stay cheap
+TARGETS = (
+    "from sierra_plots import sierra_plot",
+    "from twister_plots import twister_plot",
+    "import sierra_plots.sierra_plot_alpha",
+    "import sierra_plots.sierra_heatmap",
+    "import sierra_plots.sierra_plot_mwk",
+    "import sierra_plots.sierra_plot_rectangle",
+)
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def time_import(statement: str, repeat: int = 5) -> dict:
+    """Runs `statement` in `repeat` fresh interpreters. Returns the median and max time in ms and the heavy modules
+    that were loaded."""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    times = [r["ms"] for r in runs]
+    return {
+        "statement": statement,
+        "median_ms": statistics.median(times),
+        "max_ms": max(times),
+        "heavy_modules": runs[-1]["heavy"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time imports of the plotting packages in fresh interpreters.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per import (default: 5)")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if any median import exceeds this")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = [time_import(statement, repeat=args.repeat) for statement in TARGETS]
+    for r in results:
+        heavy = ", ".join(r["heavy_modules"]) or "none"
+        print(f"{r['median_ms']:8.1f} ms (max {r['max_ms']:6.1f})  heavy: {heavy:<20}  {r['statement']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [r for r in results if r["heavy_modules"] or (args.max_ms and r["median_ms"] > args.max_ms)]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
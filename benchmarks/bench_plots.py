@@ -0,0 +1,256 @@
+########################################################################################################################
+# Plot rendering benchmark
+#
+# Times each plotting function on synthetic data shaped like data_twister.csv / fake_data.csv, from 10^2 up to 10^6
+# time rows. The compute phase (building the figure and its artists, or the density matrix of the heatmap) and the
+# render phase (drawing and saving a PNG with the Agg backend) are timed separately, and the peak Python memory of each
+# phase is measured with tracemalloc in an extra, untimed run.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_plots --rows 100 1000 10000 --json bench_plots.json
+#   python -m benchmarks.bench_plots --baseline bench_plots.json --max-slowdown 1.25
+########################################################################################################################
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+
+import matplotlib
+
+matplotlib.use("Agg")  # Never open windows while benchmarking
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+ROWS = (10**2, 10**3, 10**4, 10**5, 10**6)
+DPI = 100
+ARM_SIZE = 20000  # Participants per arm behind the synthetic confidence limits
+
+
+##########################
+# Synthetic data
+def synthetic_twister(rows: int, seed=None) -> pd.DataFrame:
+    """Risk difference and risk ratio estimates over `rows` days, with the columns and the t=0 row of
+    data_twister.csv. Two arms accumulate risk at noisy daily hazards, scaled so the final risks are about 1-2% as in
+    the example data whatever the number of rows."""
+    rng = np.random.default_rng(seed)
+    hazard = rng.gamma(shape=4, scale=0.25, size=(2, rows)) * np.array([[0.015], [0.01]]) / rows
+    hazard[:, 0] = 0
+    risk = 1 - np.exp(-np.cumsum(hazard, axis=1))
+    placebo, treated = risk
+
+    rd = treated - placebo
+    rd_se = np.sqrt((placebo * (1 - placebo) + treated * (1 - treated)) / ARM_SIZE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rr = np.where(placebo > 0, treated / placebo, 1.0)
+        log_se = np.sqrt((1 - treated) / (ARM_SIZE * treated) + (1 - placebo) / (ARM_SIZE * placebo))
+    log_se[~np.isfinite(log_se)] = 0  # t=0: no events yet, so the limits collapse onto the estimate as in the data
+
+    data = pd.DataFrame(
+        {
+            "t": np.arange(rows),
+            "RD": rd,
+            "RD_LCL": rd - 1.96 * rd_se,
+            "RD_UCL": rd + 1.96 * rd_se,
+            "RR": rr,
+            "RR_LCL": rr * np.exp(-1.96 * log_se),
+            "RR_UCL": rr * np.exp(1.96 * log_se),
+        }
+    )
+    data["RR-LCL"] = data["RR"] - data["RR_LCL"]
+    data["UCL-RR"] = data["RR_UCL"] - data["RR"]
+    return data
+
+
+def synthetic_fake(rows: int, seed=None) -> pd.DataFrame:
+    """`synthetic_twister` plus the exaggerated *_fake risk difference columns of fake_data.csv (ten times the
+    estimate, three times the interval width)."""
+    data = synthetic_twister(rows, seed)
+    half_width = data["RD_UCL"] - data["RD"]
+    data["RD_fake"] = 10 * data["RD"]
+    data["RD_LCL_fake"] = data["RD_fake"] - 3 * half_width
+    data["RD_UCL_fake"] = data["RD_fake"] + 3 * half_width
+    return data
+
+
+##########################
+# Benchmarked functions
+# Each target builds its figure in `compute` and returns what `render` needs. `max_rows` keeps the quadratic targets
+# within memory: the heatmap holds a (rows x 1000) density matrix and the mwk plot draws 1000 quantile lines per row.
+def _sierra_alpha(data):
+    from sierra_plots.sierra_plot_alpha import sierra_plot
+
+    return sierra_plot(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t").figure
+
+
+def _sierra_mwk(data):
+    from sierra_plots.sierra_plot_mwk import sierra_plot
+
+    return sierra_plot(data, xvar="RD_fake", lcl="RD_LCL_fake", ucl="RD_UCL_fake", yvar="t").figure
+
+
+def _sierra_heatmap(data):
+    from sierra_plots.sierra_heatmap import sierra_coloring
+
+    return sierra_coloring(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+
+
+def _sierra_heatmap_adaptive(data):
+    from sierra_plots.sierra_heatmap import sierra_coloring
+
+    return sierra_coloring(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t", adaptive=True)
+
+
+def _render_heatmap(array, dpi):
+    from sierra_plots.sierra_heatmap import plot_heatmap
+
+    return _render_figure(plot_heatmap(array).figure, dpi)
+
+
+def _twister(data):
+    from twister_plots.twister import twister_plot
+
+    ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t", reference_line=1.0, log_scale=True)
+    return ax.figure
+
+
+def _render_figure(fig, dpi):
+    """Draws and saves `fig` to memory. Returns the number of artists drawn."""
+    artists = len(fig.findobj())
+    fig.savefig(io.BytesIO(), format="png", dpi=dpi)
+    plt.close(fig)
+    return artists
+
+
+TARGETS = {
+    "sierra_alpha": dict(data=synthetic_twister, compute=_sierra_alpha, render=_render_figure, max_rows=10**6),
+    "sierra_mwk": dict(data=synthetic_fake, compute=_sierra_mwk, render=_render_figure, max_rows=10**4),
+    "sierra_heatmap": dict(data=synthetic_twister, compute=_sierra_heatmap, render=_render_heatmap, max_rows=10**4),
+    "sierra_heatmap_adaptive": dict(
+        data=synthetic_twister, compute=_sierra_heatmap_adaptive, render=_render_heatmap, max_rows=10**4
+    ),
+    "twister": dict(data=synthetic_twister, compute=_twister, render=_render_figure, max_rows=10**6),
+}
+
+
+##########################
+# Measurement
+def run_case(name: str, rows: int, repeat: int = 3, dpi: int = DPI, seed: int = 0) -> dict:
+    """Times the compute and render phases of target `name` on `rows` synthetic rows (median of `repeat` runs), then
+    measures the peak traced memory each phase adds in one more run. tracemalloc sees numpy and Python allocations
+    but not the Agg canvas, which is fixed by the figure size and `dpi`."""
+    target = TARGETS[name]
+    data = target["data"](rows, seed)
+    with warnings.catch_warnings():
+        # The t=0 row has zero width limits, which scipy warns about on every call
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return _measure(name, target, data, rows, repeat, dpi)
+
+
+def _measure(name: str, target: dict, data: pd.DataFrame, rows: int, repeat: int, dpi: int) -> dict:
+    # Warm up on a tiny dataset so that first imports and font caches are not timed
+    target["render"](target["compute"](target["data"](10)), dpi)
+    compute_s, render_s = [], []
+    artists = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = target["compute"](data)
+        middle = time.perf_counter()
+        artists = target["render"](result, dpi)
+        compute_s.append(middle - start)
+        render_s.append(time.perf_counter() - middle)
+        del result
+        plt.close("all")
+
+    tracemalloc.start()
+    try:
+        result = target["compute"](data)
+        current, compute_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        target["render"](result, dpi)
+        render_peak = tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+        plt.close("all")
+
+    return {
+        "target": name,
+        "rows": rows,
+        "compute_s": statistics.median(compute_s),
+        "render_s": statistics.median(render_s),
+        "total_s": statistics.median(c + r for c, r in zip(compute_s, render_s)),
+        "compute_peak_mb": compute_peak / 2**20,
+        "render_peak_mb": render_peak / 2**20,
+        "artists": artists,
+    }
+
+
+def compare(results: list, baseline: list, max_slowdown: float) -> list:
+    """Cases of `results` whose total time is more than `max_slowdown` times that of the same case in `baseline`."""
+    previous = {(b["target"], b["rows"]): b for b in baseline if "total_s" in b}
+    regressions = []
+    for r in results:
+        b = previous.get((r["target"], r["rows"]))
+        if b and "total_s" in r and r["total_s"] > max_slowdown * b["total_s"]:
+            regressions.append({**r, "baseline_total_s": b["total_s"], "slowdown": r["total_s"] / b["total_s"]})
+    return regressions
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time the compute and render phases of the plotting functions.")
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--rows", nargs="+", type=int, default=list(ROWS), help="Time rows per synthetic dataset")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (default: 3)")
+    parser.add_argument("--dpi", type=int, default=DPI, help=f"Resolution of the rendered figures (default: {DPI})")
+    parser.add_argument("--no-limits", action="store_true", help="Also run cases above a target's row limit")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON file from an earlier run to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="Allowed total time ratio to the baseline")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.targets:
+        for rows in args.rows:
+            if rows > TARGETS[name]["max_rows"] and not args.no_limits:
+                results.append({"target": name, "rows": rows, "skipped": f"above max_rows={TARGETS[name]['max_rows']}"})
+                print(f"{name:<16} {rows:>9,} rows  skipped (above {TARGETS[name]['max_rows']:,} rows)")
+                continue
+            r = run_case(name, rows, repeat=args.repeat, dpi=args.dpi)
+            results.append(r)
+            print(
+                f"{name:<16} {rows:>9,} rows  compute {r['compute_s']:8.3f}s ({r['compute_peak_mb']:8.1f} MB)  "
+                f"render {r['render_s']:8.3f}s ({r['render_peak_mb']:8.1f} MB)  {r['artists']} artists"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"environment": environment(), "dpi": args.dpi, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.max_slowdown)
+        for r in regressions:
+            print(f"REGRESSION {r['target']} {r['rows']:,} rows: {r['total_s']:.3f}s vs {r['baseline_total_s']:.3f}s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Simulation of the ratio and product of two normal random variables."""
@@ -0,0 +1,174 @@
+########################################################################################################################
+# Ratio and product distributions: analytic densities
+#
+# Density, CDF and quantile functions for the ratio norm_2 / norm_1 (Hinkley, 1969) and the product norm_2 * norm_1 of
+# two independent normals, evaluated vectorized on a grid. As in `make_data`, v1 and v2 are the scale (SD) of each
+# normal. `validate` compares them against the Monte Carlo sampler.
+########################################################################################################################
+
+import numpy as np
+import pandas as pd
+from scipy import special
+from scipy.stats import norm
+
+QUADRATURE_NODES = 64  # Gauss-Legendre nodes per panel for the product integrals
+QUADRATURE_PANELS = 16
+CHUNK_POINTS = 4096  # Grid points integrated per block, bounding the (points x nodes) temporaries
+QUADRATURE_WIDTH = 10  # The product integrals run over norm_1 in m1 +/- QUADRATURE_WIDTH * v1
+
+
+##########################
+# Ratio: norm_2 / norm_1
+def ratio_pdf(w, m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> np.ndarray:
+    """Exact density of norm_2 / norm_1 (Hinkley, 1969, equation 1)."""
+    w = np.asarray(w, dtype=np.float64)
+    a = np.sqrt(w**2 / v2**2 + 1 / v1**2)
+    b = m2 * w / v2**2 + m1 / v1**2
+    c = m2**2 / v2**2 + m1**2 / v1**2
+    d = np.exp((b**2 - c * a**2) / (2 * a**2))
+    return (b * d / a**3) / (np.sqrt(2 * np.pi) * v1 * v2) * (2 * norm.cdf(b / a) - 1) + np.exp(-c / 2) / (
+        np.pi * v1 * v2 * a**2
+    )
+
+
+def ratio_cdf(w, m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> np.ndarray:
+    """Exact CDF of norm_2 / norm_1. With U = norm_2 - w * norm_1,
+    F(w) = P(U <= 0, norm_1 > 0) + P(U >= 0, norm_1 < 0) = Phi(h) + Phi(k) - 2 * Phi2(h, k; rho)."""
+    w = np.asarray(w, dtype=np.float64)
+    sd_u = np.sqrt(v2**2 + w**2 * v1**2)
+    h = -(m2 - w * m1) / sd_u
+    k = np.full_like(h, -m1 / v1)
+    rho = -w * v1 / sd_u
+    return np.clip(norm.cdf(h) + norm.cdf(k) - 2 * bivariate_normal_cdf(h, k, rho), 0, 1)
+
+
+def ratio_quantile(q, m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> np.ndarray:
+    center = m2 / m1 if m1 else 0.0
+    scale = np.hypot(v2 / abs(m1), abs(m2) * v1 / m1**2) if m1 else v2 / v1
+    return _invert_cdf(lambda w: ratio_cdf(w, m1, v1, m2, v2), q, center, scale)
+
+
+def ratio_mean_approx(m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> float:
+    """Second-order (delta method) mean of norm_2 / norm_1. The exact mean does not exist, but this is what Monte Carlo
+    means hover around: m2 / m1 * (1 + v1^2 / m1^2), i.e. slightly above m2 / m1."""
+    return m2 / m1 * (1 + v1**2 / m1**2)
+
+
+##########################
+# Product: norm_2 * norm_1
+def product_pdf(z, m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> np.ndarray:
+    """Density of norm_2 * norm_1 by quadrature over norm_1: f(z) = E[ f_2(z / X_1) / |X_1| ]."""
+    x, weights = _quadrature(m1, v1)
+    return _integrate(lambda zz: norm.pdf(zz / x, loc=m2, scale=v2) / np.abs(x), z, weights)
+
+
+def product_cdf(z, m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> np.ndarray:
+    """CDF of norm_2 * norm_1 by quadrature over norm_1. The integrand is bounded, so this stays accurate near 0."""
+    x, weights = _quadrature(m1, v1)
+
+    def integrand(zz):
+        below = norm.cdf(zz / x, loc=m2, scale=v2)
+        return np.where(x > 0, below, 1 - below)
+
+    return np.clip(_integrate(integrand, z, weights), 0, 1)
+
+
+def product_quantile(q, m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> np.ndarray:
+    mean, sd = product_moments(m1, v1, m2, v2)
+    return _invert_cdf(lambda z: product_cdf(z, m1, v1, m2, v2), q, mean, sd)
+
+
+def product_moments(m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1) -> tuple:
+    """Exact mean and SD of norm_2 * norm_1. The mean is exactly m1 * m2; the right skew puts the median below it."""
+    variance = m1**2 * v2**2 + m2**2 * v1**2 + v1**2 * v2**2
+    return m1 * m2, np.sqrt(variance)
+
+
+##########################
+# Validation against the sampler
+def validate(
+    m1: float = 1,
+    v1: float = 1,
+    m2: float = 1,
+    v2: float = 1,
+    n_samples: int = 10**6,
+    quantiles=(0.05, 0.5, 0.95),
+    seed=None,
+) -> pd.DataFrame:
+    """Compares the analytic quantiles with Monte Carlo quantiles of the same scenario, and reports the
+    Kolmogorov-Smirnov distance between the analytic CDF and the empirical CDF of the draws."""
+    rng = np.random.default_rng(seed)
+    norm_1 = rng.normal(m1, v1, n_samples)
+    norm_2 = rng.normal(m2, v2, n_samples)
+    rows = []
+    for name, samples, cdf, quantile in (
+        ("div", norm_2 / norm_1, ratio_cdf, ratio_quantile),
+        ("times", norm_2 * norm_1, product_cdf, product_quantile),
+    ):
+        samples = np.sort(samples)
+        # The KS distance is evaluated on a subsample of the order statistics to keep the CDF calls cheap
+        index = np.linspace(0, n_samples - 1, min(n_samples, 2000)).astype(int)
+        analytic = cdf(samples[index], m1, v1, m2, v2)
+        ks = np.max(np.maximum(np.abs(analytic - (index + 1) / n_samples), np.abs(analytic - index / n_samples)))
+        for q, a, s in zip(quantiles, quantile(quantiles, m1, v1, m2, v2), np.quantile(samples, quantiles)):
+            rows.append({"stat": name, "q": q, "analytic": a, "monte_carlo": s, "difference": s - a, "ks": ks})
+    return pd.DataFrame(rows)
+
+
+##########################
+# Helpers
+def bivariate_normal_cdf(h, k, rho) -> np.ndarray:
+    """P(X <= h, Y <= k) for standard bivariate normals with correlation `rho`, vectorized through Owen's T:
+    Phi2 = (Phi(h) + Phi(k)) / 2 - T(h, a_h) - T(k, a_k) - beta."""
+    h, k, rho = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (h, k, rho)))
+    root = np.sqrt(1 - rho**2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_h = np.where(h == 0, np.sign(k - rho * h) * np.inf, (k - rho * h) / (h * root))
+        a_k = np.where(k == 0, np.sign(h - rho * k) * np.inf, (h - rho * k) / (k * root))
+    beta = np.where((h * k < 0) | ((h * k == 0) & (h + k < 0)), 0.5, 0.0)
+    return (norm.cdf(h) + norm.cdf(k)) / 2 - special.owens_t(h, a_h) - special.owens_t(k, a_k) - beta
+
+
+def _quadrature(m1: float, v1: float):
+    """Composite Gauss-Legendre nodes and weights for E[g(X_1)], X_1 ~ N(m1, v1). A panel edge is put at 0 whenever
+    the range crosses it, so no node lands on the 1 / |x| singularity of the product density."""
+    low, high = m1 - QUADRATURE_WIDTH * v1, m1 + QUADRATURE_WIDTH * v1
+    edges = np.linspace(low, high, QUADRATURE_PANELS + 1)
+    if low < 0 < high:
+        edges = np.unique(np.concatenate([edges, [0.0]]))
+    nodes, weights = special.roots_legendre(QUADRATURE_NODES)
+    half = np.diff(edges)[:, np.newaxis] / 2
+    x = (edges[:-1, np.newaxis] + half + half * nodes).ravel()
+    w = (half * weights).ravel() * norm.pdf(x, loc=m1, scale=v1)
+    return x, w
+
+
+def _integrate(integrand, points, weights) -> np.ndarray:
+    """Applies the quadrature `weights` to `integrand` (called with a column of points) in blocks of CHUNK_POINTS."""
+    points = np.asarray(points, dtype=np.float64)
+    flat = points.ravel()
+    out = np.empty(flat.size)
+    for start in range(0, flat.size, CHUNK_POINTS):
+        block = flat[start : start + CHUNK_POINTS, np.newaxis]
+        out[start : start + CHUNK_POINTS] = integrand(block) @ weights
+    return out.reshape(points.shape)
+
+
+def _invert_cdf(cdf, q, center: float, scale: float, iterations: int = 100) -> np.ndarray:
+    """Vectorized bisection for cdf(x) = q. The bracket around `center` doubles until it contains every q."""
+    q = np.asarray(q, dtype=np.float64)
+    low = np.full(q.shape, center - scale)
+    high = np.full(q.shape, center + scale)
+    for _ in range(200):
+        below, above = cdf(low) > q, cdf(high) < q
+        if not (below.any() or above.any()):
+            break
+        low = np.where(below, center - 2 * (center - low), low)
+        high = np.where(above, center + 2 * (high - center), high)
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        left = cdf(middle) < q
+        low, high = np.where(left, middle, low), np.where(left, high, middle)
+        if np.all(high - low <= 1e-12 * np.maximum(1, np.abs(middle))):
+            break
+    return (low + high) / 2
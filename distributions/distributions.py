@@ -1,8 +1,11 @@
-import pandas as pd
+########################################################################################################################
+# Ratio and product distributions of two normals
+#
+# Run from the repository root: python -m distributions.distributions
+########################################################################################################################
+
 import numpy as np
-import matplotlib.pyplot as plt
-import itertools
-from scipy.stats import norm
+import pandas as pd
 
 STEPS = 10000
 
@@ -29,35 +32,32 @@ def make_data(m1: float = 1, v1: float = 1, m2: float = 1, v2: float = 1):
     return df, df_div
 
 
-plt.style.use("ggplot")
-fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2)
+##########################
+# Example: histograms of two normals, their ratio and their product
+def main(n_samples: int = STEPS):
+    import matplotlib.pyplot as plt
+
+    from .streaming import stream_ratio_product
 
+    plt.style.use("ggplot")
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2)
 
-df_dist, df_div = make_data(5, 1, 15, 2)
+    # Samples are binned as they are drawn, so only the counts (not the samples) reach matplotlib
+    streams = stream_ratio_product(5, 1, 15, 2, n_samples=n_samples, histogram_bins=STEPS // 50)
 
+    for ax, name in ((ax1, "norm_1"), (ax2, "norm_2"), (ax3, "div"), (ax4, "times")):
+        s = streams[name].summary()
+        quantiles = (
+            f"{s['q5']: 2.2f}, {s['q95']: 2.2f}"
+            if name.startswith("norm")
+            else f"{s['q5']: 2.2f}, {s['q50']: 2.2f}, {s['q95']: 2.2f}"
+        )
+        streams[name].histogram.plot(ax, label=f"Mean={s['mean']: 2.2f}, SD={s['sd']: 2.2f} ({quantiles})")
 
-ax1.hist(
-    df_dist["norm_1_1"],
-    bins=STEPS // 50,
-    label=f"Mean={df_dist['norm_1_1'].mean(): 2.2f}, SD={df_dist['norm_1_1'].std(): 2.2f} ({df_dist['norm_1_1'].quantile(0.05): 2.2f}, {df_dist['norm_1_1'].quantile(0.95): 2.2f})",
-)
-ax2.hist(
-    df_dist["norm_2_1"],
-    bins=STEPS // 50,
-    label=f"Mean={df_dist['norm_2_1'].mean(): 2.2f}, SD={df_dist['norm_2_1'].std(): 2.2f} ({df_dist['norm_2_1'].quantile(0.05): 2.2f}, {df_dist['norm_2_1'].quantile(0.95): 2.2f})",
-)
-ax3.hist(
-    df_div["div"],
-    bins=STEPS // 50,
-    label=f"Mean={df_div['div'].mean(): 2.2f}, SD={df_div['div'].std(): 2.2f} ({df_div['div'].quantile(0.05): 2.2f}, {df_div['div'].quantile(0.5): 2.2f}, {df_div['div'].quantile(0.95): 2.2f})",
-)
-ax4.hist(
-    df_div["times"],
-    bins=STEPS // 50,
-    label=f"Mean={df_div['times'].mean(): 2.2f}, SD={df_div['times'].std(): 2.2f} ({df_div['times'].quantile(0.05): 2.2f}, {df_div['times'].quantile(0.5): 2.2f}, {df_div['times'].quantile(0.95): 2.2f})",
-)
+    for ax in (ax1, ax2, ax3, ax4):
+        ax.legend(loc="best")
+    plt.show()
 
 
-for ax in (ax1, ax2, ax3, ax4):
-    ax.legend(loc="best")
-plt.show()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+########################################################################################################################
+# Ratio and product distributions: histogram accumulators
+#
+# Bins samples as they are generated so figures can be drawn from the counts alone (ax.stairs), without keeping the
+# raw samples around. Accumulators from different chunks or workers combine with `merge`.
+########################################################################################################################
+
+import abc
+
+import numpy as np
+
+BINS = 200  # STEPS // 50, the bin count the original ax.hist calls used
+
+
+class _Histogram(abc.ABC):
+    """Shared counting and plotting for the accumulators below."""
+
+    counts: np.ndarray
+
+    @property
+    @abc.abstractmethod
+    def edges(self) -> np.ndarray:
+        """Bin edges, one more than there are counts."""
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def density(self) -> np.ndarray:
+        """Counts normalized so the histogram integrates to 1, as ``ax.hist(density=True)``."""
+        return self.counts / (self.counts.sum() * np.diff(self.edges))
+
+    def plot(self, ax, density: bool = False, fill: bool = True, **kwargs):
+        """Draws the histogram on `ax` with a single ``ax.stairs`` artist, which is returned."""
+        values = self.density() if density else self.counts
+        return ax.stairs(values, self.edges, fill=fill, **kwargs)
+
+
+class FixedHistogram(_Histogram):
+    """Histogram on fixed bin edges. Values outside the edges are tallied in `underflow` and `overflow`."""
+
+    def __init__(self, edges):
+        self._edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(self._edges.size - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def from_range(cls, low: float, high: float, bins: int = BINS) -> "FixedHistogram":
+        return cls(np.linspace(low, high, bins + 1))
+
+    @classmethod
+    def from_sample(cls, values, bins: int = BINS, tail: float = 0.001) -> "FixedHistogram":
+        """Edges spanning the central 1 - 2 * `tail` of a pilot sample, padded by 5% on each side. Heavy tails (e.g. a
+        ratio whose denominator can be near 0) then land in `underflow`/`overflow` instead of squeezing the bulk of
+        the distribution into a handful of bins."""
+        values = np.asarray(values, dtype=np.float64)
+        low, high = np.quantile(values[np.isfinite(values)], [tail, 1 - tail])
+        pad = 0.05 * (high - low)
+        return cls.from_range(low - pad, high + pad, bins)
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self._edges
+
+    def add(self, values) -> "FixedHistogram":
+        values = np.asarray(values).ravel()
+        values = values[np.isfinite(values)]
+        self.counts += np.histogram(values, bins=self._edges)[0]
+        self.underflow += int(np.count_nonzero(values < self._edges[0]))
+        self.overflow += int(np.count_nonzero(values > self._edges[-1]))
+        return self
+
+    def merge(self, other: "FixedHistogram") -> "FixedHistogram":
+        if not np.array_equal(self._edges, other._edges):
+            raise ValueError("FixedHistogram objects can only be merged when their edges are identical")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+
+class AdaptiveHistogram(_Histogram):
+    """Histogram whose range grows with the data. Bins sit on a lattice of multiples of `width` anchored at 0, so new
+    bins can be added on either side without rebinning. When more than `max_bins` bins are needed, neighbouring bins
+    are paired up and the width doubles, which keeps memory bounded.
+
+    Two adaptive histograms can be merged when one width is a power-of-two multiple of the other, e.g. when every
+    worker is created with the same explicit `width`.
+    """
+
+    def __init__(self, bins: int = BINS, width: float = None, max_bins: int = None):
+        self.bins = bins
+        self.width = width  # Set from the first chunk when not given
+        self.max_bins = max_bins or 2 * bins
+        self.start = 0  # Lattice index of the first bin
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def edges(self) -> np.ndarray:
+        return (self.start + np.arange(self.counts.size + 1)) * self.width
+
+    def add(self, values) -> "AdaptiveHistogram":
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return self
+        if self.width is None:
+            spread = values.max() - values.min()
+            self.width = spread / self.bins if spread > 0 else 1.0
+        index = self._cover(values.min(), values.max())
+        self.counts += np.bincount(index(values), minlength=self.counts.size)
+        return self
+
+    def merge(self, other: "AdaptiveHistogram") -> "AdaptiveHistogram":
+        if not other.counts.size:
+            return self
+        if not self.counts.size:
+            self.width, self.start, self.counts = other.width, other.start, other.counts.copy()
+            return self
+        other = other._copy()
+        while True:
+            while other.width < self.width:
+                other._coarsen()
+            while self.width < other.width:
+                self._coarsen()
+            if not np.isclose(self.width, other.width):
+                raise ValueError("AdaptiveHistogram widths must differ by a power of two to be merged")
+            width = self.width
+            self._cover(other.start * width, (other.start + other.counts.size - 0.5) * width)
+            if self.width == width:  # Covering may have coarsened self; if so, line the widths up again
+                break
+        offset = other.start - self.start
+        self.counts[offset : offset + other.counts.size] += other.counts
+        return self
+
+    def _cover(self, low: float, high: float):
+        """Extends (and if needed coarsens) the bins to cover [low, high]. Returns a function mapping values to bin
+        positions."""
+        while True:
+            first, last = int(np.floor(low / self.width)), int(np.floor(high / self.width))
+            if self.counts.size:
+                first, last = min(first, self.start), max(last, self.start + self.counts.size - 1)
+            if last - first + 1 <= self.max_bins:
+                break
+            self._coarsen()
+        if self.counts.size:
+            self.counts = np.concatenate(
+                [
+                    np.zeros(self.start - first, dtype=np.int64),
+                    self.counts,
+                    np.zeros(last - (self.start + self.counts.size - 1), dtype=np.int64),
+                ]
+            )
+        else:
+            self.counts = np.zeros(last - first + 1, dtype=np.int64)
+        self.start = first
+        width, start, size = self.width, self.start, self.counts.size
+        return lambda v: np.clip(np.floor(v / width).astype(np.int64) - start, 0, size - 1)
+
+    def _coarsen(self) -> None:
+        """Doubles the bin width, adding each pair of neighbouring bins together."""
+        if self.counts.size:
+            if self.start % 2:  # Keep bins aligned on the coarser lattice
+                self.counts = np.concatenate([[0], self.counts])
+                self.start -= 1
+            if self.counts.size % 2:
+                self.counts = np.concatenate([self.counts, [0]])
+            self.counts = self.counts.reshape(-1, 2).sum(axis=1)
+            self.start //= 2
+        self.width *= 2
+
+    def _copy(self) -> "AdaptiveHistogram":
+        copy = AdaptiveHistogram(self.bins, self.width, self.max_bins)
+        copy.start, copy.counts = self.start, self.counts.copy()
+        return copy
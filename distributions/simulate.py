@@ -0,0 +1,142 @@
+########################################################################################################################
+# Ratio and product distributions: batched Monte Carlo
+#
+# Sweeps a grid of (m1, v1, m2, v2) scenarios and summarises norm_2 / norm_1 and norm_2 * norm_1 for each one, as
+# make_data does for a single scenario, without sorting the samples or building a DataFrame per draw.
+########################################################################################################################
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .distributions import STEPS
+
+SCENARIO_COLUMNS = ("m1", "v1", "m2", "v2")
+QUANTILES = (0.05, 0.5, 0.95)
+MAX_BATCH_BYTES = 256 * 2**20  # Samples held in memory at once, across all scenarios of a batch
+
+
+def scenario_grid(m1=(1,), v1=(1,), m2=(1,), v2=(1,)) -> pd.DataFrame:
+    """Every combination of the given means and SDs, one scenario per row. As in `make_data`, v1 and v2 are used as
+    the scale (SD) of each normal."""
+    return pd.DataFrame(list(itertools.product(m1, v1, m2, v2)), columns=list(SCENARIO_COLUMNS))
+
+
+def simulate_scenarios(
+    scenarios,
+    n_samples: int = STEPS,
+    seed=None,
+    dtype=np.float64,
+    quantiles=QUANTILES,
+    max_batch_bytes: int = MAX_BATCH_BYTES,
+    chunk_size: int = None,
+) -> pd.DataFrame:
+    """Simulates the ratio and product of two independent normals for each scenario and summarises them.
+
+    Parameters
+    ----------
+    scenarios : pandas DataFrame, array-like
+        One scenario per row with columns m1, v1, m2, v2 (see `scenario_grid`).
+    n_samples : int, optional
+        Draws per scenario. Defaults to `STEPS`.
+    seed : int, numpy SeedSequence, optional
+        Root seed. Each scenario gets its own generator spawned from it, so results do not depend on batching.
+    dtype : numpy dtype, optional
+        float64 (default) or float32, which halves memory use.
+    quantiles : tuple, optional
+        Quantiles to report. Defaults to the 5th, 50th and 95th percentiles.
+    max_batch_bytes : int, optional
+        Upper bound on the sample memory of one batch of scenarios. A single scenario is never split.
+    chunk_size : int, optional
+        Streaming mode: draw each scenario in chunks of this many samples and summarise them with running moments and
+        a t-digest (see `streaming.stream_ratio_product`), so memory no longer grows with `n_samples`. Quantiles are
+        then t-digest estimates rather than exact sample quantiles.
+
+    Returns
+    -------
+    pandas DataFrame with the scenario columns followed by the mean, SD, quantiles and bias (mean minus the naive
+    expectation m2 / m1 or m1 * m2) of the ratio and of the product.
+    """
+    if isinstance(scenarios, pd.DataFrame):
+        params = scenarios[list(SCENARIO_COLUMNS)].to_numpy(dtype=float)
+    else:
+        params = np.atleast_2d(np.asarray(scenarios, dtype=float))
+    dtype = np.dtype(dtype)
+    quantiles = np.asarray(quantiles, dtype=float)
+    seeds = _seed_sequence(seed).spawn(len(params))
+    names = ["mean", "sd"] + [_quantile_name(q) for q in quantiles] + ["bias"]
+    columns = [f"{stat}_{name}" for stat in ("div", "times") for name in names]
+    if chunk_size is not None:
+        return _stream_scenarios(params, n_samples, seeds, dtype, quantiles, chunk_size, columns)
+    generators = [np.random.default_rng(s) for s in seeds]
+
+    # Three (batch x n_samples) arrays are alive at once: norm_1, the ratio (overwriting norm_2), and the product
+    batch = max(1, int(max_batch_bytes // (3 * n_samples * dtype.itemsize)))
+    summaries = []
+    for start in range(0, len(params), batch):
+        p = params[start : start + batch]
+        norm_1 = np.empty(shape=(len(p), n_samples), dtype=dtype)
+        norm_2 = np.empty(shape=(len(p), n_samples), dtype=dtype)
+        for j, rng in enumerate(generators[start : start + batch]):
+            rng.standard_normal(dtype=dtype, out=norm_1[j])
+            rng.standard_normal(dtype=dtype, out=norm_2[j])
+        norm_1 *= p[:, [1]].astype(dtype)
+        norm_1 += p[:, [0]].astype(dtype)
+        norm_2 *= p[:, [3]].astype(dtype)
+        norm_2 += p[:, [2]].astype(dtype)
+
+        times = norm_2 * norm_1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            div = np.divide(norm_2, norm_1, out=norm_2)
+
+        summaries.append(
+            np.hstack(
+                [
+                    _summarise(div, quantiles, p[:, 2] / p[:, 0]),
+                    _summarise(times, quantiles, p[:, 2] * p[:, 0]),
+                ]
+            )
+        )
+
+    return _scenario_frame(params, n_samples, np.vstack(summaries), columns)
+
+
+def _stream_scenarios(params, n_samples, seeds, dtype, quantiles, chunk_size, columns) -> pd.DataFrame:
+    """Streaming mode of `simulate_scenarios`, one scenario at a time in constant memory."""
+    from .streaming import stream_ratio_product  # streaming builds on this module
+
+    rows = []
+    for (m1, v1, m2, v2), s in zip(params, seeds):
+        streams = stream_ratio_product(m1, v1, m2, v2, n_samples=n_samples, chunk_size=chunk_size, seed=s, dtype=dtype)
+        row = []
+        for stat, expected in (("div", m2 / m1), ("times", m2 * m1)):
+            summary = streams[stat].summary(quantiles)
+            row += [summary["mean"], summary["sd"]] + [summary[_quantile_name(q)] for q in quantiles]
+            row.append(summary["mean"] - expected)
+        rows.append(row)
+    return _scenario_frame(params, n_samples, np.array(rows), columns)
+
+
+def _scenario_frame(params, n_samples, summaries, columns) -> pd.DataFrame:
+    result = pd.DataFrame(summaries, columns=columns)
+    result.insert(0, "n", n_samples)
+    for k, name in reversed(list(enumerate(SCENARIO_COLUMNS))):
+        result.insert(0, name, params[:, k])
+    return result
+
+
+def _summarise(samples: np.ndarray, quantiles: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """Row-wise mean, SD, quantiles and bias. np.quantile partitions rather than sorts each row."""
+    mean = samples.mean(axis=1, dtype=np.float64)
+    sd = samples.std(axis=1, ddof=1, dtype=np.float64)  # ddof=1 matches pandas .std()
+    q = np.quantile(samples, quantiles, axis=1).T
+    return np.column_stack([mean, sd, q, mean - expected])
+
+
+def _quantile_name(q: float) -> str:
+    return f"q{100 * q:g}".replace(".", "_")
+
+
+def _seed_sequence(seed) -> np.random.SeedSequence:
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
@@ -0,0 +1,208 @@
+########################################################################################################################
+# Ratio and product distributions: streaming summaries
+#
+# Constant-memory summaries for simulations too large to hold in memory. Samples are drawn in chunks and folded into
+# mergeable running moments (Welford / Chan) and a merging t-digest, which gives the mean, SD and quantiles with error
+# bounds. Summaries from different chunks, workers or machines combine with `merge`.
+########################################################################################################################
+
+import numpy as np
+import pandas as pd
+
+from .histogram import FixedHistogram
+from .simulate import QUANTILES, _quantile_name, _seed_sequence
+
+CHUNK_SIZE = 2**20  # Draws per chunk
+COMPRESSION = 500  # t-digest compression; more centroids give tighter quantiles at the tails
+Z_95 = 1.959963984540054
+
+
+class RunningMoments:
+    """Count, mean and sum of squared deviations, updated a chunk at a time and mergeable across streams."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> "RunningMoments":
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size:
+            chunk_mean = values.mean()
+            self._combine(values.size, chunk_mean, np.square(values - chunk_mean).sum())
+        return self
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        if other.n:
+            self._combine(other.n, other.mean, other.m2)
+        return self
+
+    def _combine(self, n: int, mean: float, m2: float) -> None:
+        # Chan et al. pairwise update, which reduces to Welford's for single values
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.n * n / total
+        self.n = total
+
+    @property
+    def sd(self) -> float:
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    @property
+    def sem(self) -> float:
+        return self.sd / np.sqrt(self.n) if self.n > 1 else np.nan
+
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) for quantiles in constant memory. Centroids are small near the tails, so
+    extreme quantiles such as the 5th and 95th percentile stay accurate even for heavy-tailed ratios."""
+
+    def __init__(self, compression: float = COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def n(self) -> float:
+        return self.weights.sum()
+
+    def update(self, values: np.ndarray) -> "TDigest":
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = np.sort(values[np.isfinite(values)])
+        if values.size:
+            # Compress the chunk on its own first (a plain sort), then merge the two small sets of centroids
+            chunk = TDigest(self.compression)
+            chunk.min, chunk.max = values[0], values[-1]
+            chunk._compress(values, np.ones(values.size), presorted=True)
+            self.merge(chunk)
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray, presorted: bool = False) -> None:
+        if not presorted:
+            order = np.argsort(means, kind="stable")
+            means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        # k1 scale function: each centroid may span at most one unit of k, which is narrow near q = 0 and q = 1
+        q_mid = (cumulative - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        group = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.diff(group, prepend=-1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q) -> np.ndarray:
+        """Interpolated quantile(s) `q` in [0, 1]."""
+        q = np.clip(np.asarray(q, dtype=np.float64), 0, 1)
+        if not self.weights.size:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        ranks = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q * total, ranks, values)
+
+    def rank_error(self, q) -> np.ndarray:
+        """Half the weight (as a fraction of n) of the centroid covering quantile `q`, a bound on the sketch's rank
+        error at that quantile."""
+        q = np.asarray(q, dtype=np.float64)
+        cumulative = np.cumsum(self.weights)
+        index = np.clip(np.searchsorted(cumulative, q * cumulative[-1]), 0, self.weights.size - 1)
+        return self.weights[index] / (2 * cumulative[-1])
+
+
+class StreamSummary:
+    """Running moments plus a t-digest for one stream of samples, and optionally a histogram (see `histogram`)."""
+
+    def __init__(self, compression: float = COMPRESSION, histogram=None):
+        self.moments = RunningMoments()
+        self.digest = TDigest(compression)
+        self.histogram = histogram
+
+    def update(self, values: np.ndarray) -> "StreamSummary":
+        self.moments.update(values)
+        self.digest.update(values)
+        if self.histogram is not None:
+            self.histogram.add(values)
+        return self
+
+    def merge(self, other: "StreamSummary") -> "StreamSummary":
+        self.moments.merge(other.moments)
+        self.digest.merge(other.digest)
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram.merge(other.histogram)
+        return self
+
+    def summary(self, quantiles=QUANTILES) -> dict:
+        """Mean, SD and quantiles with 95% bounds. The mean bound is mean +/- 1.96 SEM. Each quantile bound combines the
+        binomial (order statistic) sampling error of the quantile with the digest's rank error, mapped back to values
+        through the digest."""
+        n = self.moments.n
+        result = {
+            "n": n,
+            "mean": self.moments.mean,
+            "mean_lo": self.moments.mean - Z_95 * self.moments.sem,
+            "mean_hi": self.moments.mean + Z_95 * self.moments.sem,
+            "sd": self.moments.sd,
+        }
+        for q in quantiles:
+            spread = Z_95 * np.sqrt(q * (1 - q) / n) + self.digest.rank_error(q)
+            name = _quantile_name(q)
+            result[name] = float(self.digest.quantile(q))
+            result[f"{name}_lo"] = float(self.digest.quantile(q - spread))
+            result[f"{name}_hi"] = float(self.digest.quantile(q + spread))
+        return result
+
+
+def stream_ratio_product(
+    m1: float = 1,
+    v1: float = 1,
+    m2: float = 1,
+    v2: float = 1,
+    n_samples: int = 10**8,
+    chunk_size: int = CHUNK_SIZE,
+    seed=None,
+    dtype=np.float64,
+    compression: float = COMPRESSION,
+    histogram_bins: int = None,
+    histogram_tail: float = 0.001,
+) -> dict:
+    """Draws `n_samples` pairs of normals in chunks of `chunk_size` and streams norm_1, norm_2, their ratio
+    (norm_2 / norm_1) and their product into `StreamSummary` objects. Memory use depends on `chunk_size` and
+    `compression`, not on `n_samples`. As in `make_data`, v1 and v2 are the scale (SD) of each normal. With
+    `histogram_bins`, each stream also bins its samples for plotting, on edges set from the first chunk (see
+    `FixedHistogram.from_sample`).
+
+    Returns
+    -------
+    dict mapping "norm_1", "norm_2", "div" and "times" to their StreamSummary
+    """
+    rng = np.random.default_rng(_seed_sequence(seed))
+    dtype = np.dtype(dtype)
+    summaries = {name: StreamSummary(compression) for name in ("norm_1", "norm_2", "div", "times")}
+    for start in range(0, n_samples, chunk_size):
+        size = min(chunk_size, n_samples - start)
+        norm_1 = rng.standard_normal(size, dtype=dtype) * dtype.type(v1) + dtype.type(m1)
+        norm_2 = rng.standard_normal(size, dtype=dtype) * dtype.type(v2) + dtype.type(m2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            chunk = {"norm_1": norm_1, "norm_2": norm_2, "div": norm_2 / norm_1, "times": norm_2 * norm_1}
+        for name, values in chunk.items():
+            if histogram_bins and summaries[name].histogram is None:
+                summaries[name].histogram = FixedHistogram.from_sample(values, histogram_bins, histogram_tail)
+            summaries[name].update(values)
+    return summaries
+
+
+def summary_table(summaries: dict, quantiles=QUANTILES) -> pd.DataFrame:
+    """One row per stream of `stream_ratio_product` (or any dict of StreamSummary objects)."""
+    return pd.DataFrame({name: s.summary(quantiles) for name, s in summaries.items()}).T
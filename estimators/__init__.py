@@ -0,0 +1 @@
+"""Estimators that turn participant-level time-to-event data into the tables the Sierra and Twister plots draw."""
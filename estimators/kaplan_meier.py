@@ -0,0 +1,151 @@
+########################################################################################################################
+# Kaplan-Meier risk differences and risk ratios
+#
+# Builds the t, RD, RD_LCL, RD_UCL, RR, RR_LCL, RR_UCL table of data_twister.csv from (time, event, arm) records. The
+# records are sorted once; events and numbers at risk at every event time then come from cumulative counts, so the
+# whole table costs O(n log n) however many event times there are. Confidence limits use Greenwood's variance for each
+# arm's risk, on the risk difference directly and on the log risk ratio by the delta method.
+#
+#   table = risk_table(time, event, arm)  # arm: 1 for treatment, 0 for placebo
+#   ax = twister_plot(table, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+########################################################################################################################
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+COLUMNS = ("t", "RD", "RD_LCL", "RD_UCL", "RR", "RR_LCL", "RR_UCL")
+
+
+##########################
+# One arm
+def kaplan_meier(time, event, at=None) -> tuple:
+    """Kaplan-Meier risk (1 - survival) and its Greenwood variance at each time of `at`.
+
+    Parameters
+    ----------
+    time : array-like
+        Follow-up time of each participant.
+    event : array-like
+        1 (or True) where follow-up ended with the event, 0 where it was censored.
+    at : array-like, optional
+        Times to evaluate at. Defaults to the distinct event times.
+
+    Returns
+    -------
+    The times, the risk at each time and its variance. Once everyone left at risk has had the event the risk is 1 and
+    the variance, for which Greenwood's formula is undefined, is set to 0.
+    """
+    time, event = _check(time, event)
+    order = np.argsort(time, kind="stable")
+    time, event = time[order], event[order]
+    event_times = _distinct(time[event])
+    risk, variance = _sorted_kaplan_meier(time, event, event_times)
+    if at is None:
+        return event_times, risk, variance
+    # The estimate is a step function of the event times: each time of `at` takes the value at the last one before it
+    at = np.asarray(at, dtype=float)
+    last = np.searchsorted(event_times, at, side="right") - 1
+    return at, np.where(last >= 0, risk[last], 0.0), np.where(last >= 0, variance[last], 0.0)
+
+
+def _sorted_kaplan_meier(time: np.ndarray, event: np.ndarray, at: np.ndarray) -> tuple:
+    """`kaplan_meier` on records already sorted by time, at increasing times `at` that include every event time."""
+    at_risk = time.size - np.searchsorted(time, at, side="left")  # Follow-up lasting until at least t
+    events = np.bincount(np.searchsorted(at, time[event]), minlength=at.size)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hazard = np.where(at_risk > 0, events / at_risk, 0.0)
+        greenwood = np.where(at_risk > events, events / (at_risk * (at_risk - events)), 0.0)
+    survival = np.cumprod(1 - hazard)
+    variance = survival**2 * np.cumsum(greenwood)
+    return 1 - survival, variance
+
+
+##########################
+# Two arms
+def risk_table(time, event, arm, treated=1, alpha: float = 0.05) -> pd.DataFrame:
+    """Kaplan-Meier risk difference (treated - reference) and risk ratio (treated / reference) with their confidence
+    limits, at t = 0 and at every time either arm has an event (t = 0 only once when there are events at t = 0). The
+    columns are `COLUMNS`, as in data_twister.csv.
+
+    Parameters
+    ----------
+    time : array-like
+        Follow-up time of each participant.
+    event : array-like
+        1 (or True) where follow-up ended with the event, 0 where it was censored.
+    arm : array-like
+        Arm of each participant. Rows equal to `treated` form the treated arm, all others the reference arm.
+    treated : optional
+        Value of `arm` marking the treated arm. Defaults to 1.
+    alpha : float, optional
+        1 - coverage of the confidence limits. Defaults to 0.05.
+
+    Returns
+    -------
+    pandas DataFrame. The risk ratio and its limits are missing until both arms have had an event, and its limits
+    where either risk has reached 1.
+    """
+    time, event = _check(time, event)
+    arm = np.asarray(arm)
+    if arm.shape != time.shape:
+        raise ValueError(f"time and arm must have the same length, got {time.size} and {arm.size}")
+    treat = arm == treated
+    if treat.all() or not treat.any():
+        raise ValueError(f"Both arms need participants; {treat.sum()} of {treat.size} have arm == {treated!r}")
+
+    # One sort for everything: each arm's records stay in time order when selected from the sorted arrays
+    order = np.argsort(time, kind="stable")
+    time, event, treat = time[order], event[order], treat[order]
+    at = _distinct(time[event])
+    risk_1, var_1 = _sorted_kaplan_meier(time[treat], event[treat], at)
+    risk_0, var_0 = _sorted_kaplan_meier(time[~treat], event[~treat], at)
+
+    z = norm.ppf(1 - alpha / 2)
+    rd = risk_1 - risk_0
+    rd_se = np.sqrt(var_1 + var_0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        defined = (risk_1 > 0) & (risk_0 > 0)
+        rr = np.where(defined, risk_1 / risk_0, np.nan)
+        log_se = np.sqrt(var_1 / risk_1**2 + var_0 / risk_0**2)  # Delta method: Var(log F) = Var(F) / F^2
+    # Greenwood's variance of a risk of 1 is set to 0, which would collapse the limits onto the ratio
+    log_se[~defined | (risk_1 >= 1) | (risk_0 >= 1)] = np.nan
+
+    table = pd.DataFrame(
+        {
+            "t": at,
+            "RD": rd,
+            "RD_LCL": rd - z * rd_se,
+            "RD_UCL": rd + z * rd_se,
+            "RR": rr,
+            "RR_LCL": rr * np.exp(-z * log_se),
+            "RR_UCL": rr * np.exp(z * log_se),
+        }
+    )
+    if not _has_origin(at):
+        return table  # Events at t = 0 already give the first row
+    origin = pd.DataFrame({"t": [0.0], "RD": 0.0, "RD_LCL": 0.0, "RD_UCL": 0.0, "RR": 1.0, "RR_LCL": 1.0, "RR_UCL": 1.0})
+    return pd.concat([origin, table], ignore_index=True)
+
+
+def _has_origin(at: np.ndarray) -> bool:
+    """Whether `risk_table` prepends a t = 0 row to the event times `at`, i.e. whether no event happens at t = 0."""
+    return at.size == 0 or at[0] > 0
+
+
+def _check(time, event) -> tuple:
+    time = np.asarray(time, dtype=float)
+    event = np.asarray(event).astype(bool)
+    if time.shape != event.shape or time.ndim != 1:
+        raise ValueError(f"time and event must be 1-dimensional and of the same length, got {time.shape} and {event.shape}")
+    if not np.isfinite(time).all():
+        raise ValueError("time has missing or infinite values")
+    return time, event
+
+
+def _distinct(sorted_values: np.ndarray) -> np.ndarray:
+    """Distinct values of an already sorted array, without sorting it again."""
+    if not sorted_values.size:
+        return sorted_values
+    return sorted_values[np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]])]
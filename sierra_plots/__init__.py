@@ -0,0 +1,47 @@
+"""Sierra plots: shaded, nested confidence bands for risk difference and risk ratio functions over time.
+
+The plotting functions are exported lazily, so ``from sierra_plots import sierra_plot`` does not import numpy, pandas,
+matplotlib or scipy until a plot is actually drawn. The example scripts run as modules from the repository root, e.g.
+``python -m sierra_plots.make_plots``.
+"""
+
+import importlib
+
+# Exported name -> submodule that defines it
+_EXPORTS = {
+    "sierra_plot": "sierra_plot_alpha",
+    "norm_rd": "sierra_plot_alpha",
+    "norm_rr": "sierra_plot_alpha",
+    "sd_dict": "sierra_plot_alpha",
+    "sierra_layout": "sierra_plot_alpha",
+    "SierraLayout": "layout",
+    "draw_sierra": "layout",
+    "sierra_coloring": "sierra_heatmap",
+    "plot_heatmap": "sierra_heatmap",
+    "register_interval_distribution": "interval_distributions",
+    "get_interval_distribution": "interval_distributions",
+    "profile_plots": "profiling",
+    "IntervalCache": "interval_cache",
+    "plot_grid": "grid",
+    "IncrementalSierra": "incremental",
+    "IncrementalHeatmap": "incremental",
+    "read_estimates": "estimates_io",
+    "iter_estimates": "estimates_io",
+    "convert_estimates": "estimates_io",
+    "load_estimates": "estimates_io",
+    "cached_estimates": "estimates_io",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    globals()[name] = value  # Only resolve once
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,29 @@
+########################################################################################################################
+# Sierra Plots: lazy imports
+#
+# numpy, pandas, matplotlib, scipy and seaborn together take seconds to import. Modules in this package bind them via
+# `lazy_import` so that importing a plotting function is cheap, and the real import happens on first attribute access.
+########################################################################################################################
+
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """Placeholder module that imports its target the first time one of its attributes is looked up."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = name
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self.__dict__["_lazy_target"])
+        # Copy the real namespace over so later lookups never reach __getattr__ again
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Returns a stand-in for module `name` that is only imported when first used, e.g.
+    ``plt = lazy_import("matplotlib.pyplot")``."""
+    return _LazyModule(name)
@@ -0,0 +1,151 @@
+########################################################################################################################
+# Sierra / Twister Plots: headless batch rendering
+#
+# Renders every job of a manifest in parallel on a process pool with the Agg backend. Each manifest row names the
+# estimates CSV, the columns to plot, the plot type, the scale and the output path, e.g.
+#
+#   data,xvar,lcl,ucl,yvar,plot,scale,output
+#   fake_data.csv,RD,RD_LCL_fake,RD_UCL_fake,t,sierra,rd,out/sierra_rd.png
+#   data_twister.csv,RR,RR_LCL,RR_UCL,t,twister,rr,out/twister_rr.png
+#
+# Usage (from the repository root, where the CSVs live):
+#   python -m sierra_plots.batch_plots sierra_plots/example_manifest.csv --workers 4
+#   python -m sierra_plots.batch_plots sierra_plots/example_manifest.csv --profile phases.jsonl
+########################################################################################################################
+
+# Importing required dependencies
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+matplotlib.use("Agg")  # Never open windows or block on plt.show() in workers
+
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from .estimates_io import cached_estimates, read_estimates
+from .profiling import plot_profiler, profile_plots
+from .sierra_plot_alpha import sierra_plot, norm_rd, norm_rr
+from twister_plots.twister import twister_plot
+
+MANIFEST_COLUMNS = ("data", "xvar", "lcl", "ucl", "yvar", "plot", "scale", "output")
+PLOT_TYPES = ("sierra", "twister")
+SCALES = ("rd", "rr")
+
+
+def read_manifest(path: str) -> list:
+    """Reads a manifest CSV into a list of job dictionaries. Optional columns `treat_labs` (two names separated by
+    ';') and `dpi` are passed through when present."""
+    manifest = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = [c for c in MANIFEST_COLUMNS if c not in manifest.columns]
+    if missing:
+        raise ValueError(f"Manifest {path} is missing column(s): {', '.join(missing)}")
+
+    jobs = manifest.to_dict(orient="records")
+    for n, job in enumerate(jobs):
+        if job["plot"] not in PLOT_TYPES:
+            raise ValueError(f"Manifest row {n}: plot must be one of {PLOT_TYPES}, got '{job['plot']}'")
+        if job["scale"] not in SCALES:
+            raise ValueError(f"Manifest row {n}: scale must be one of {SCALES}, got '{job['scale']}'")
+    return jobs
+
+
+def render_job(job: dict, dpi: int = 600, cache: bool = True) -> float:
+    """Renders and saves a single manifest job. With `cache`, the data is read through the .npy cache next to the CSV
+    (see `estimates_io.cached_estimates`). Returns the wall time in seconds."""
+    start = time.perf_counter()
+    profiler = plot_profiler("batch_plots.render_job")
+    with profiler.phase("read"):
+        columns = [job["yvar"], job["xvar"], job["lcl"], job["ucl"]]
+        data = cached_estimates(job["data"], columns) if cache else read_estimates(job["data"], columns)
+    ratio = job["scale"] == "rr"
+    options = dict(
+        xvar=job["xvar"],
+        lcl=job["lcl"],
+        ucl=job["ucl"],
+        yvar=job["yvar"],
+        reference_line=1.0 if ratio else 0.0,
+        log_scale=ratio,
+    )
+    if job.get("treat_labs"):
+        options["treat_labs"] = job["treat_labs"].split(";")
+    if ratio:
+        options["xlab"] = "Risk Ratio"
+
+    if job["plot"] == "sierra":
+        ax = sierra_plot(data, interval_func=norm_rr if ratio else norm_rd, **options)
+    else:
+        ax = twister_plot(data, **options)
+
+    profiler.figure = ax.figure
+    with profiler.phase("save"):
+        ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+        plt.tight_layout()  # Sets spacing of the border of the plot
+        output_dir = os.path.dirname(job["output"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        ax.figure.savefig(job["output"], dpi=int(job.get("dpi") or dpi))
+        plt.close(ax.figure)  # Workers render many jobs; release each figure once saved
+    return time.perf_counter() - start
+
+
+def profile_job(job: dict, dpi: int = 600, cache: bool = True) -> tuple:
+    """`render_job` with profiling switched on in the worker. Returns the wall time and the phase records (see
+    `profiling.profile_plots`), each tagged with the job's output path."""
+    with profile_plots() as profile:
+        seconds = render_job(job, dpi, cache)
+    return seconds, [dict(record, output=job["output"]) for record in profile.records]
+
+
+def run_batch(jobs: list, workers: int = None, dpi: int = 600, profile: str = None, cache: bool = True) -> int:
+    """Renders `jobs` on a process pool, printing the timing of each job as it finishes. Stops at the first failure,
+    cancelling every job that has not started. With `profile`, the per-phase records of every job are written to that
+    path as JSON lines. Returns the number of failed jobs (0 or 1)."""
+    total = len(jobs)
+    start = time.perf_counter()
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        task = profile_job if profile else render_job
+        futures = {executor.submit(task, job, dpi, cache): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                print(f"[{done}/{total}] FAILED {job['output']}: {error!r}", file=sys.stderr)
+                executor.shutdown(wait=True, cancel_futures=True)
+                return 1
+            if profile:
+                (seconds, job_records) = result
+                records += job_records
+            else:
+                seconds = result
+            print(f"[{done}/{total}] {job['output']} ({job['plot']}, {job['scale']}) {seconds:.2f}s")
+
+    print(f"Rendered {total} plot(s) in {time.perf_counter() - start:.2f}s")
+    if profile:
+        with open(profile, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        print(f"Wrote {len(records)} phase timing(s) to {profile}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render Sierra and Twister plots from a manifest CSV.")
+    parser.add_argument("manifest", help="CSV with columns " + ", ".join(MANIFEST_COLUMNS))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--dpi", type=int, default=600, help="Resolution of the saved figures (default: 600)")
+    parser.add_argument("--profile", default=None, help="Write per-phase timings of every job to this JSON lines file")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every CSV instead of using the .npy caches")
+    args = parser.parse_args(argv)
+    jobs = read_manifest(args.manifest)
+    return run_batch(jobs, workers=args.workers, dpi=args.dpi, profile=args.profile, cache=not args.no_cache)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
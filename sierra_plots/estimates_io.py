@@ -0,0 +1,215 @@
+########################################################################################################################
+# Sierra / Twister Plots: reading estimate files
+#
+# Typed, column-selective loading of the time-to-event estimate CSVs. Only the columns a plot needs are parsed, all as
+# float64; spreadsheet error tokens (#NUM!, #DIV/0!, ...) and stray TRUE/FALSE cells become NaN instead of turning a
+# column into strings. Files too large to parse at once can be streamed in chunks, or converted once to a .npy file
+# that later loads memory-mapped, without parsing or copying. `cached_estimates` keeps that .npy file next to the CSV
+# and rebuilds it when the CSV changes, so repeated renders of the same data parse it once.
+#
+#   data = read_estimates("data_twister.csv", ["t", "RD", "RD_LCL", "RD_UCL"])
+#   convert_estimates("big.csv", ["t", "RD", "RD_LCL", "RD_UCL"], "big.npy")
+#   data = load_estimates("big.npy", ["t", "RD", "RD_LCL", "RD_UCL"])
+#   data = cached_estimates("big.csv", ["t", "RD", "RD_LCL", "RD_UCL"])  # Parses once, then memory-maps
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Cell values read as missing, on top of pandas' defaults (empty cells, NA, NaN, ...)
+ERROR_TOKENS = ("#NUM!", "#DIV/0!", "#VALUE!", "#N/A", "#REF!", "#NAME?", "#NULL!", "TRUE", "FALSE", "True", "False")
+CHUNK_ROWS = 2**20  # Rows parsed at a time when streaming
+HEADER_BYTES = 128  # Space reserved for the .npy header, which is only written once the row count is known
+CACHE_DIR = ".estimates_cache"  # Directory, next to the CSV, of the files written by `cached_estimates`
+
+
+def _columns(columns) -> list:
+    return list(dict.fromkeys(columns))  # Drop repeats, e.g. when the same column is both xvar and lcl
+
+
+def _read_options(columns: list) -> dict:
+    return dict(
+        usecols=columns,
+        dtype={c: "float64" for c in columns},
+        na_values=list(ERROR_TOKENS),
+        engine="c",
+    )
+
+
+def read_estimates(path: str, columns) -> pd.DataFrame:
+    """Reads `columns` of the CSV at `path` as float64, in the given order. Raises ValueError if a column is missing.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV.
+    columns : list
+        Column names to read, e.g. the yvar, xvar, lcl and ucl of a plot.
+
+    Returns
+    -------
+    pandas DataFrame
+    """
+    columns = _columns(columns)
+    return pd.read_csv(path, **_read_options(columns))[columns]
+
+
+def iter_estimates(path: str, columns, chunk_rows: int = CHUNK_ROWS):
+    """Yields `columns` of the CSV at `path` as float64 DataFrames of up to `chunk_rows` rows, so the whole file is never
+    in memory at once. The index continues from one chunk to the next."""
+    columns = _columns(columns)
+    with pd.read_csv(path, chunksize=chunk_rows, **_read_options(columns)) as reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def convert_estimates(path: str, columns, out: str, chunk_rows: int = CHUNK_ROWS) -> str:
+    """Streams `columns` of the CSV at `path` into the .npy file `out`, a (rows x columns) float64 array in the order
+    of `columns`. Memory use is bounded by `chunk_rows`. The file is written under a temporary name and renamed when
+    complete. Returns `out`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV.
+    columns : list
+        Column names to convert.
+    out : str
+        Path of the .npy file to write.
+    chunk_rows : int, optional
+        Rows parsed at a time. Defaults to `CHUNK_ROWS`.
+
+    Returns
+    -------
+    str
+    """
+    columns = _columns(columns)
+    temporary = f"{out}.{os.getpid()}.tmp"
+    rows = 0
+    try:
+        with open(temporary, "wb") as f:
+            # The row count is only known at the end, so the data goes after a fixed-size gap that the header fills
+            f.write(b"\0" * HEADER_BYTES)
+            for chunk in iter_estimates(path, columns, chunk_rows):
+                np.ascontiguousarray(chunk.to_numpy(dtype=np.float64)).tofile(f)
+                rows += len(chunk)
+            f.seek(0)
+            header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)), "fortran_order": False}
+            np.lib.format.write_array_header_1_0(f, dict(header, shape=(rows, len(columns))))
+            if f.tell() != HEADER_BYTES:
+                raise ValueError(f"{out}: the .npy header for {rows} x {len(columns)} does not fit {HEADER_BYTES} bytes")
+        os.replace(temporary, out)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return out
+
+
+def load_estimates(path: str, columns) -> pd.DataFrame:
+    """Memory-maps a .npy file from `convert_estimates` as a read-only DataFrame. Nothing is read from disk until the
+    plot touches it, and the columns share the mapped memory.
+
+    Parameters
+    ----------
+    path : str
+        Path to the .npy file.
+    columns : list
+        The column names it was converted with.
+
+    Returns
+    -------
+    pandas DataFrame
+    """
+    columns = _columns(columns)
+    values = np.load(path, mmap_mode="r")
+    if values.ndim != 2 or values.shape[1] != len(columns):
+        raise ValueError(f"{path} holds an array of shape {values.shape}, not {len(columns)} columns")
+    return pd.DataFrame(values, columns=columns, copy=False)
+
+
+def cached_estimates(path: str, columns, cache_dir: str = None, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """`read_estimates` through a .npy cache: the first call converts `columns` of the CSV with `convert_estimates`,
+    later calls memory-map the converted file (see `load_estimates`) as long as the CSV is unchanged.
+
+    The CSV counts as unchanged when its size and modification time match those recorded at conversion. When only the
+    modification time differs, e.g. after a checkout or a copy, its content hash decides, and a match is recorded so
+    the next call takes the fast path again.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV.
+    columns : list
+        Column names to read.
+    cache_dir : str, optional
+        Directory for the cache files. Defaults to `CACHE_DIR` in the directory of the CSV.
+    chunk_rows : int, optional
+        Rows parsed at a time when converting. Defaults to `CHUNK_ROWS`.
+
+    Returns
+    -------
+    pandas DataFrame
+    """
+    columns = _columns(columns)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    key = hashlib.blake2b(json.dumps(columns).encode(), digest_size=8).hexdigest()
+    stem = os.path.join(cache_dir, f"{os.path.basename(path)}.{key}")
+    array_path, meta_path = stem + ".npy", stem + ".json"
+
+    source = os.stat(path)
+    meta = _read_meta(meta_path)
+    if meta is not None and meta["columns"] == columns and os.path.exists(array_path):
+        if meta["size"] == source.st_size and meta["mtime_ns"] == source.st_mtime_ns:
+            return load_estimates(array_path, columns)
+        if meta["size"] == source.st_size and meta["blake2b"] == _file_hash(path):
+            _write_meta(meta_path, dict(meta, mtime_ns=source.st_mtime_ns))
+            return load_estimates(array_path, columns)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = _file_hash(path)
+    convert_estimates(path, columns, array_path, chunk_rows)
+    after = os.stat(path)
+    # A CSV that changed while it was converted gets no metadata, so the next call converts it again
+    if (after.st_size, after.st_mtime_ns) == (source.st_size, source.st_mtime_ns):
+        meta = {
+            "source": os.path.abspath(path),
+            "columns": columns,
+            "size": source.st_size,
+            "mtime_ns": source.st_mtime_ns,
+            "blake2b": digest,
+        }
+        _write_meta(meta_path, meta)
+    return load_estimates(array_path, columns)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # Missing or half-written: rebuild
+
+
+def _write_meta(path: str, meta: dict) -> None:
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(meta, f)
+    os.replace(temporary, path)
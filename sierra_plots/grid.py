@@ -0,0 +1,160 @@
+########################################################################################################################
+# Sierra / Twister Plots: small multiples
+#
+# Draws one Sierra or Twister panel per subgroup into a single figure, so a report of many subgroups is one figure and
+# one savefig instead of a figure, a twin axis and a savefig per subgroup. Panels share their axes and a single legend,
+# and only the top (or bottom) row of Sierra panels carries the 'Favors ...' twin axis; twister_plot draws its own on
+# every panel.
+#
+#   fig, axes = plot_grid({"Age < 65": young, "Age 65+": old}, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+#   fig.savefig("subgroups.png", dpi=600)
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+import math
+
+from ._lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+
+from .layout import SierraLayout, draw_sierra
+
+PANEL_SIZE = (3.5, 4.5)  # Width by height of each panel, in inches
+PLOT_TYPES = ("sierra", "twister")
+# Space in inches for the y-axis labels (left), x-axis labels (bottom), 'Favors ...' labels (top, or "favors" more at
+# the bottom), the figure legend, and between panels whose inner tick labels are hidden by sharing
+MARGINS = {"left": 0.8, "right": 0.15, "bottom": 0.65, "top": 0.5, "legend": 0.35, "shared": 0.15, "favors": 0.5}
+
+
+def plot_grid(
+    panels,
+    xvar=None,
+    lcl=None,
+    ucl=None,
+    yvar=None,
+    plot="sierra",
+    ncols=4,
+    panel_size=PANEL_SIZE,
+    sharex=True,
+    sharey=True,
+    legend=True,
+    **options,
+):
+    """Draws every panel into one figure of `ncols` columns.
+
+    Parameters
+    ----------
+    panels : dict, list
+        Panel title -> DataFrame of estimates (one per subgroup), or a list of DataFrames. At least one panel. For
+        Sierra panels the values may also be precomputed `SierraLayout` objects, e.g. built in parallel with
+        `sierra_layout`; these are drawn as they were laid out, with their own labels and 'Favors ...' placement.
+    xvar, lcl, ucl, yvar : str, optional
+        Column names, as in `sierra_plot`. Not needed when every panel is a SierraLayout.
+    plot : str, optional
+        "sierra" (default) or "twister".
+    ncols : int, optional
+        Panels per row. Defaults to 4.
+    panel_size : tuple, optional
+        Width and height of each panel in inches. Defaults to `PANEL_SIZE`.
+    sharex, sharey : bool, optional
+        Share the x- and y-axes across panels. Shared limits span every panel. Defaults to True.
+    legend : bool, optional
+        Add one legend for the whole figure, below the panels. Defaults to True.
+    **options
+        Passed on to `sierra_layout` or `twister_plot`, e.g. `xlab`, `log_scale`, `reference_line`, `treat_labs` or
+        `interval_func`. Panels given as SierraLayout objects were laid out already and ignore them, including
+        `treat_labs_top` and `treat_labs_spacing`.
+
+    Returns
+    -------
+    The figure and the (rows x ncols) array of panel axes
+    """
+    if plot not in PLOT_TYPES:
+        raise ValueError(f"plot must be one of {PLOT_TYPES}, got '{plot}'")
+    if isinstance(panels, dict):
+        titles, items = list(panels.keys()), list(panels.values())
+    else:
+        titles, items = [None] * len(panels), list(panels)
+    count = len(items)
+    if not count:
+        raise ValueError("plot_grid needs at least one panel")
+    options.setdefault("treat_labs_spacing", "  ")  # The single-plot tab spacing is wider than a panel
+    ncols = max(1, min(ncols, count))
+    nrows = math.ceil(count / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(panel_size[0] * ncols, panel_size[1] * nrows), squeeze=False)
+    # Room for 'Favors ...' labels below the x-axis labels when any panel puts them there
+    favors_top = all(
+        item.favors_top if isinstance(item, SierraLayout) else options.get("treat_labs_top", True) for item in items
+    )
+    _set_margins(fig, nrows, ncols, panel_size, sharex, sharey, legend, favors_top)
+
+    panel_axes = list(axes.flat[:count])
+    for k, (item, ax) in enumerate(zip(items, panel_axes)):
+        row, col = divmod(k, ncols)
+        bottom = k + ncols >= count  # Last panel of its column
+        if plot == "sierra":
+            layout = item if isinstance(item, SierraLayout) else _sierra_layout(item, xvar, lcl, ucl, yvar, options)
+            draw_sierra(layout, ax=ax, twin_axis=row == 0 if layout.favors_top else bottom)
+        else:
+            from twister_plots.twister import twister_plot
+
+            twister_plot(item, xvar, lcl, ucl, yvar, ax=ax, **options)
+
+        if titles[k] is not None:
+            ax.text(0.03, 0.98, titles[k], transform=ax.transAxes, ha="left", va="top", fontsize=9)
+        if sharex and not bottom:
+            ax.set_xlabel("")
+            ax.tick_params(axis="x", which="both", labelbottom=False)
+        if sharey and col != 0:
+            ax.set_ylabel("")
+            ax.tick_params(axis="y", which="both", labelleft=False)
+
+    for ax in axes.flat[count:]:
+        ax.remove()
+    # Axes are linked only once every panel is drawn: each panel sets its own limits, which on axes shared from the
+    # start would be propagated to every other panel, once per panel
+    if sharex:
+        xlim = (min(ax.get_xlim()[0] for ax in panel_axes), max(ax.get_xlim()[1] for ax in panel_axes))
+        for ax in panel_axes[1:]:
+            ax.sharex(panel_axes[0])
+        panel_axes[0].set_xlim(xlim)
+    if sharey:
+        ylim = (min(ax.get_ylim()[0] for ax in panel_axes), max(ax.get_ylim()[1] for ax in panel_axes))
+        for ax in panel_axes[1:]:
+            ax.sharey(panel_axes[0])
+        panel_axes[0].set_ylim(ylim)
+    if legend:
+        handles, labels = axes.flat[0].get_legend_handles_labels()
+        if handles:
+            fig.legend(handles, labels, loc="lower center", ncol=min(len(labels), 2 * ncols), fontsize=8, frameon=False)
+    return fig, axes
+
+
+def _set_margins(fig, nrows, ncols, panel_size, sharex, sharey, legend, favors_top) -> None:
+    """Fixed margins, in inches, around and between panels. Every panel has the same labels and ticks, so fixed space
+    fits them, and unlike constrained layout it costs nothing at each savefig."""
+    width, height = panel_size[0] * ncols, panel_size[1] * nrows
+    left, right, top = MARGINS["left"], MARGINS["right"], MARGINS["top"]
+    bottom = MARGINS["bottom"] + (MARGINS["legend"] if legend else 0) + (0 if favors_top else MARGINS["favors"])
+    wgap = MARGINS["shared"] if sharey else MARGINS["left"]
+    hgap = top + (MARGINS["shared"] if sharex else MARGINS["bottom"])
+    # subplots_adjust takes the gaps as fractions of the mean panel width and height
+    panel_width = (width - left - right - (ncols - 1) * wgap) / ncols
+    panel_height = (height - bottom - top - (nrows - 1) * hgap) / nrows
+    fig.subplots_adjust(
+        left=left / width,
+        right=1 - right / width,
+        bottom=bottom / height,
+        top=1 - top / height,
+        wspace=wgap / panel_width,
+        hspace=hgap / panel_height,
+    )
+
+
+def _sierra_layout(data, xvar, lcl, ucl, yvar, options):
+    from .sierra_plot_alpha import sierra_layout  # sierra_plot_alpha imports the plotting stack on first use
+
+    return sierra_layout(data, xvar, lcl, ucl, yvar, **options)
+
@@ -0,0 +1,324 @@
+########################################################################################################################
+# Sierra Plots: incremental updates
+#
+# Ongoing trials add a few time rows with every data cut. `IncrementalSierra` and `IncrementalHeatmap` keep their
+# figure between cuts: `append` evaluates the intervals (or densities) of the new rows only, extends the drawn bands,
+# step line and images with them, and moves the axis limits, so an update costs as much as the new rows rather than
+# the whole follow-up. Rendering the saved file still draws every row.
+#
+#   plot = IncrementalSierra(cut_1, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+#   plot.savefig("sierra.png")
+#   plot.append(cut_2.loc[cut_2["t"] > cut_1["t"].max()])  # Only the rows after the last plotted time
+#   plot.savefig("sierra.png")
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+plt = lazy_import("matplotlib.pyplot")
+mcollections = lazy_import("matplotlib.collections")
+mcolors = lazy_import("matplotlib.colors")
+mpatches = lazy_import("matplotlib.patches")
+mtransforms = lazy_import("matplotlib.transforms")
+
+from .density_grid import STEP, WINDOW_SD, centered_grid, density_grid, sparse_density_grid
+from .interval_distributions import get_interval_distribution
+from .layout import FIGSIZE, _favors_axis
+from .profiling import plot_profiler
+from .sierra_heatmap import heatmap_image
+from .sierra_plot_alpha import LEGACY_INTERVAL_FUNCS, norm_rd, sd_dict, sierra_layout, x_extent, x_limits
+from .step_geometry import post_step_polygons, step_times
+
+OVERLAP_ROWS = 2  # Rows of the image below that an appended heatmap image repeats, see `IncrementalHeatmap._draw_rows`
+
+
+##########################
+# Sierra plot
+class IncrementalSierra:
+    """A Sierra plot that grows with newly appended time rows. Draws the same picture as `sierra_plot` of all rows
+    appended so far. The interval distribution must be pointwise, i.e. each row's bounds only depend on that row, as
+    for every distribution in `interval_distributions`.
+
+    Parameters
+    ----------
+    data : pandas DataFrame
+        The rows of the first data cut.
+    xvar, lcl, ucl, yvar : str
+        Column names, as in `sierra_plot`.
+    xlab, ylab, log_scale, reference_line, treat_labs, treat_labs_top, treat_labs_spacing, interval_func, cache
+        As in `sierra_plot`. `cache` only applies to the first cut.
+    ax : matplotlib axes, optional
+        Axes to draw on. Defaults to a new figure of size `layout.FIGSIZE`.
+    """
+
+    def __init__(
+        self,
+        data,
+        xvar,
+        lcl,
+        ucl,
+        yvar,
+        xlab="Risk Difference",
+        ylab="Days",
+        log_scale=False,
+        reference_line=0.0,
+        treat_labs=("Treatment", "Placebo"),
+        treat_labs_top=True,
+        treat_labs_spacing="\t\t\t",
+        interval_func=norm_rd,
+        cache=True,
+        ax=None,
+    ):
+        self.columns = (xvar, lcl, ucl, yvar)
+        self.log_scale = log_scale
+        self.reference_line = reference_line
+        self.levels = np.fromiter(sd_dict.keys(), dtype=float)
+        self.factory = get_interval_distribution(LEGACY_INTERVAL_FUNCS.get(interval_func, interval_func))
+        layout = sierra_layout(
+            data,
+            xvar,
+            lcl,
+            ucl,
+            yvar,
+            xlab=xlab,
+            ylab=ylab,
+            log_scale=log_scale,
+            reference_line=reference_line,
+            treat_labs=treat_labs,
+            treat_labs_top=treat_labs_top,
+            treat_labs_spacing=treat_labs_spacing,
+            interval_func=interval_func,
+            cache=cache,
+        )
+
+        # Drawn as `layout.draw_sierra` does, except that every band is its own collection, so appended rows extend
+        # each band without reordering the others
+        if ax is None:
+            fig, ax = plt.subplots(figsize=FIGSIZE)  # fig_size is width by height
+        self.ax = ax
+        self.bands = []
+        for color, label in zip(layout.colors, layout.labels):
+            band = mcollections.PolyCollection([], color=color, label=label, alpha=1)
+            self.bands.append(ax.add_collection(band, autolim=False))
+        self._extend_bands(layout.time, layout.lower, layout.upper)
+        (self.line,) = ax.step(layout.estimate, layout.step_time, color="w", where="post", lw=0.5)
+        self.reference = ax.vlines(reference_line, 0, layout.ylim[1], colors="black", linestyles="--", label=None)
+        _favors_axis(ax, layout.favors_label, layout.favors_top)
+        ax.set_ylabel(layout.ylab)  # Sets the y-label
+        if log_scale:
+            ax.set_xscale("log")
+        ax.set_xlabel(layout.xlab, fontdict={"size": 11})
+
+        self.rows = layout.time.size
+        self._max_t = layout.ylim[1]
+        self._xlimit = x_extent(data[lcl].to_numpy(dtype=float), data[ucl].to_numpy(dtype=float), log_scale)
+        self._last = (layout.time[-1:], layout.lower[:, -1:], layout.upper[:, -1:])  # Where appended steps start
+        self._set_limits()
+
+    def __repr__(self) -> str:
+        return f"IncrementalSierra(rows={self.rows}, ylim={self.ax.get_ylim()})"
+
+    def append(self, data):
+        """Adds the rows of `data`, which must come after every plotted time, and returns the plot."""
+        xvar, lcl, ucl, yvar = self.columns
+        time = data[yvar].to_numpy(dtype=float)
+        if not time.size:
+            return self
+        if np.nanmin(time) < self._last[0][0]:
+            raise ValueError(f"Appended rows must come after the last plotted time, {self._last[0][0]}")
+        profiler = plot_profiler("incremental.IncrementalSierra.append")  # No-op unless profile_plots is active
+        profiler.figure = self.ax.figure
+
+        with profiler.phase("intervals"):
+            location = data[xvar].to_numpy(dtype=float)
+            sd = (data[ucl].to_numpy(dtype=float) - location) / 1.96
+            (lower, upper) = self.factory(location, sd).interval(self.levels)
+
+        # The last plotted row's step runs up to the first new time, so it is drawn again with the new rows
+        with profiler.phase("bands"):
+            previous_time, previous_lower, previous_upper = self._last
+            self._extend_bands(
+                np.concatenate([previous_time, time]),
+                np.hstack([previous_lower, lower]),
+                np.hstack([previous_upper, upper]),
+            )
+
+        with profiler.phase("step_line"):
+            step_time = step_times(np.concatenate([previous_time, time]))
+            self.line.set_data(
+                np.concatenate([self.line.get_xdata(), location]),
+                np.concatenate([self.line.get_ydata()[:-1], step_time]),
+            )
+
+        with profiler.phase("limits"):
+            self.rows += time.size
+            self._max_t = np.nanmax([self._max_t, np.nanmax(time)])
+            limits = x_extent(data[lcl].to_numpy(dtype=float), data[ucl].to_numpy(dtype=float), self.log_scale)
+            self._xlimit = np.nanmax([self._xlimit, limits])
+            self._last = (time[-1:], lower[:, -1:], upper[:, -1:])
+            self._set_limits()
+        return self
+
+    def savefig(self, fname, **kwargs):
+        """Saves the figure, see `matplotlib.figure.Figure.savefig`."""
+        self.ax.figure.savefig(fname, **kwargs)
+
+    def _extend_bands(self, time, lower, upper) -> None:
+        polygons, bands = post_step_polygons(time, lower, upper)
+        for k, band in enumerate(self.bands):
+            pieces = [polygons[i] for i in np.flatnonzero(bands == k)]
+            band.get_paths().extend(mcollections.PolyCollection(pieces).get_paths())
+            band.stale = True
+
+    def _set_limits(self) -> None:
+        self.reference.set_segments([[(self.reference_line, 0), (self.reference_line, self._max_t)]])
+        self.ax.set_ylim((0, self._max_t))  # Sets the min and max of the y-axis
+        self.ax.set_xlim(x_limits(self._xlimit, self.log_scale))  # Sets the min and max of the x-axis
+
+
+##########################
+# Heatmap
+class IncrementalHeatmap:
+    """A Sierra heatmap that grows with newly appended time rows. Each `append` evaluates the densities of its rows
+    and draws them as one more image, below which the earlier images are left as they are. All images share one color
+    scale, which widens when new rows need it.
+
+    The x-grid is fixed by the confidence limits of the first cut, or by `xlimit`. Rows whose limits reach past it
+    widen the grid, which redraws every row at once, so an `xlimit` with room to spare keeps updates incremental.
+
+    Parameters
+    ----------
+    data : pandas DataFrame
+        The rows of the first data cut. As in `sierra_coloring`, each row is drawn at its index.
+    xvar, lcl, ucl, yvar : str
+        Column names, as in `sierra_coloring`.
+    xlimit : float, optional
+        Largest absolute confidence limit the grid covers. Defaults to that of the first cut.
+    adaptive, window_sd
+        As in `sierra_coloring`.
+    reference_line, cmap
+        As in `plot_heatmap`.
+    ax : matplotlib axes, optional
+        Axes to draw on. Defaults to the current axes.
+    """
+
+    def __init__(
+        self,
+        data,
+        xvar,
+        lcl,
+        ucl,
+        yvar,
+        xlimit: float = None,
+        adaptive: bool = False,
+        window_sd: float = WINDOW_SD,
+        reference_line: float = 0.0,
+        cmap="Greys",
+        ax=None,
+    ):
+        self.columns = (xvar, lcl, ucl, yvar)
+        self.adaptive = adaptive
+        self.window_sd = window_sd
+        self.reference_line = reference_line
+        self.cmap = cmap
+        self.ax = plt.gca() if ax is None else ax
+        self.images = []
+        self.norm = None
+        self.colorbar = None
+        self.reference = None
+        self._chunks = []  # Rows, estimates and SDs of every append, kept for redrawing on a wider grid
+        self._first = 0  # Bottom row of the last image
+        self._height = 0  # Time rows covered by the images
+        self._reach = 0.0 if xlimit is None else float(xlimit)
+        self.append(data)
+
+    def __repr__(self) -> str:
+        return f"IncrementalHeatmap(rows={self._height}, images={len(self.images)}, step={self.step})"
+
+    def append(self, data):
+        """Adds the rows of `data`, whose index must come after every drawn row, and returns the heatmap."""
+        xvar, lcl, ucl, yvar = self.columns
+        rows = data.index.to_numpy()
+        if not rows.size:
+            return self
+        if self._chunks and rows.min() <= self._chunks[-1][0].max():
+            raise ValueError(f"Appended rows must come after the last drawn row, {self._chunks[-1][0].max()}")
+        location = data[xvar].to_numpy(dtype=float)
+        sd = (data[ucl].to_numpy(dtype=float) - location) / 1.96  # The SD sierra_coloring uses
+        height = max(self._height, int(np.max(data[yvar])) + 1)
+        self._chunks.append((rows, location, sd))
+
+        if self._set_grid(data):
+            self._redraw(height)
+        else:
+            self._draw_rows(rows, location, sd, height)
+        return self
+
+    def savefig(self, fname, **kwargs):
+        """Saves the figure, see `matplotlib.figure.Figure.savefig`."""
+        self.ax.figure.savefig(fname, **kwargs)
+
+    def _set_grid(self, data) -> bool:
+        """Builds the x-grid `sierra_coloring` would for limits up to the widest seen so far. Returns whether an
+        existing grid had to be widened."""
+        lcl, ucl = self.columns[1:3]
+        reach = float(np.max(np.abs([np.min(data[lcl]), np.max(data[ucl])])))
+        if self.images and reach <= self._reach:
+            return False
+        self._reach = max(self._reach, reach)
+        self.x, self.grid_columns, self.step = centered_grid([-self._reach], [self._reach])
+        return bool(self.images)
+
+    def _redraw(self, height: int) -> None:
+        for image in self.images:
+            image.remove()
+        self.images, self._height = [], 0
+        rows, location, sd = (np.concatenate(values) for values in zip(*self._chunks))
+        self._draw_rows(rows, location, sd, height, rescale=True)
+
+    def _draw_rows(self, rows, location, sd, height: int, rescale: bool = False) -> None:
+        boundary = min(rows.min(), self._height)  # Rows between the images and the new rows stay empty
+        # Images are smoothed when resampled, which fades each one towards its edges. A new image therefore starts
+        # with a copy of the top rows of the image below, and is clipped a row above its own bottom edge: every pixel
+        # row shown is then smoothed from the same rows as in a single image of all rows, and no seam shows.
+        first = max(boundary - OVERLAP_ROWS, self._first) if self.images else boundary
+        shape = (height - first, 2 * STEP)
+        if self.adaptive:
+            array = sparse_density_grid(
+                location, sd, self.x, shape, rows=rows - first, columns=self.grid_columns, window_sd=self.window_sd
+            ).toarray(dtype=np.float32)
+        else:
+            array = np.zeros(shape)
+            density_grid(location, sd, self.x, out=array, rows=rows - first, columns=self.grid_columns)
+        if self.images:
+            below = np.ma.getdata(self.images[-1].get_array())
+            array[: boundary - first] = below[first - self._first : boundary - self._first]
+
+        low, high = np.nanmin(array), np.nanmax(array)
+        if self.norm is None:
+            self.norm = mcolors.Normalize(vmin=low, vmax=high)
+        elif rescale:
+            self.norm.vmin, self.norm.vmax = low, high
+        else:
+            self.norm.vmin, self.norm.vmax = min(self.norm.vmin, low), max(self.norm.vmax, high)
+        image = heatmap_image(self.ax, array, step=self.step, first_row=first, cmap=self.cmap, norm=self.norm)
+        if first < boundary:
+            transform = mtransforms.blended_transform_factory(self.ax.transAxes, self.ax.transData)  # Full width
+            image.set_clip_path(mpatches.Rectangle((0, first + 1), 1, height - first - 1, transform=transform))
+        self.images.append(image)
+        if self.colorbar is None:
+            self.colorbar = self.ax.figure.colorbar(image, ax=self.ax)
+        elif rescale:
+            self.colorbar.update_normal(image)  # The image it was made for is gone
+
+        self._first, self._height = first, height
+        if self.ax.get_autoscaley_on():  # imshow fits the y-axis to the new image alone
+            self.ax.set_ylim((0, height), auto=None)
+        segments = [[(self.reference_line, 0), (self.reference_line, height)]]
+        if self.reference is None:
+            self.reference = self.ax.vlines(self.reference_line, 0, height, colors="black", linestyles="--", label=None)
+        else:
+            self.reference.set_segments(segments)
@@ -0,0 +1,188 @@
+########################################################################################################################
+# Sierra Plots: interval cache
+#
+# Memoizes the (levels x time) band matrices of `interval_distributions`, keyed by a hash of the data they were computed
+# from, the distribution and the coverage levels. Re-rendering a dataset with different labels, ticks or layout then
+# skips the statistics entirely. Entries live in a bounded in-memory LRU and, optionally, in .npz files on disk that
+# survive between processes. Nothing is evicted from disk unless asked to.
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+import collections
+import functools
+import hashlib
+import os
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+
+MAX_ENTRIES = 32
+MAX_BYTES = 256 * 2**20  # Band matrices held in memory at once
+
+
+def interval_key(location, scale, distribution, levels):
+    """Content hash of one band computation: the estimates and SDs (values, dtype and shape), the distribution and the
+    coverage levels. Returns None when the distribution has no stable identity (a lambda or a function defined inside
+    another function), in which case the result must not be cached."""
+    name = _distribution_name(distribution)
+    if name is None:
+        return None
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(name.encode())
+    for values in (location, scale, levels):
+        values = np.ascontiguousarray(values, dtype=float)
+        digest.update(repr(values.shape).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _distribution_name(distribution):
+    """Stable name of a registered name, class, function or functools.partial of one. A registered name stands for the
+    factory registered under it now, so re-registering the name never serves the bands of the previous factory."""
+    if isinstance(distribution, str):
+        from .interval_distributions import get_interval_distribution
+
+        return _distribution_name(get_interval_distribution(distribution))
+    if isinstance(distribution, functools.partial):
+        inner = _distribution_name(distribution.func)
+        args = [_argument_name(a) for a in distribution.args]
+        keywords = sorted((k, _argument_name(v)) for k, v in distribution.keywords.items())
+        return None if inner is None else f"{inner}{args!r}{keywords!r}"
+    qualname = getattr(distribution, "__qualname__", None)
+    if qualname is None or "<" in qualname:  # <lambda>, <locals>
+        return None
+    return f"{distribution.__module__}.{qualname}"
+
+
+def _argument_name(value) -> str:
+    """Bound argument of a functools.partial as it goes into a key. Arrays (e.g. bootstrap replicates) are hashed by
+    content, since their repr leaves out all but a few values."""
+    if isinstance(value, np.ndarray):
+        digest = hashlib.blake2b(np.ascontiguousarray(value).tobytes(), digest_size=20)
+        return f"array({value.dtype}, {value.shape}, {digest.hexdigest()})"
+    return repr(value)
+
+
+class IntervalCache:
+    """LRU cache of (lower, upper) band matrices.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Most entries kept in memory. Defaults to `MAX_ENTRIES`.
+    max_bytes : int, optional
+        Most bytes of band matrices kept in memory. Defaults to `MAX_BYTES`.
+    directory : str, optional
+        Also store every entry as ``<key>.npz`` in this directory, and look there on a memory miss.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES, directory: str = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (lower, upper), least recently used first
+        self._bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key):
+        """The cached (lower, upper) pair for `key`, or None."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as stored:
+                bounds = (stored["lower"], stored["upper"])
+            self.disk_hits += 1
+            self._remember(key, bounds)
+            return self._entries.get(key, bounds)
+        self.misses += 1
+        return None
+
+    def put(self, key, lower, upper) -> None:
+        """Stores a (lower, upper) pair. The arrays are made read-only, since every later hit shares them."""
+        bounds = (np.array(lower, dtype=float), np.array(upper, dtype=float))
+        self._remember(key, bounds)
+        if self.directory is not None:
+            import tempfile  # Only the disk tier needs it, and it is slow to import
+
+            # Write to a temporary file first so a concurrent reader never sees half an entry
+            handle, temporary = tempfile.mkstemp(suffix=".npz", dir=self.directory)
+            with os.fdopen(handle, "wb") as f:
+                np.savez(f, lower=bounds[0], upper=bounds[1])
+            os.replace(temporary, self._path(key))
+
+    def get_or_compute(self, key, compute):
+        """The cached pair for `key`, or the result of ``compute()``, which is then stored. A None key is never
+        cached."""
+        if key is None:
+            return compute()
+        bounds = self.get(key)
+        if bounds is None:
+            bounds = compute()
+            self.put(key, *bounds)
+            bounds = self._entries.get(key, bounds)
+        return bounds
+
+    def evict(self, key=None, disk: bool = False) -> None:
+        """Drops `key` (or every entry, if None) from memory, and also from disk when `disk` is True."""
+        keys = list(self._entries) if key is None else [key]
+        for k in keys:
+            if k in self._entries:
+                lower, upper = self._entries.pop(k)
+                self._bytes -= lower.nbytes + upper.nbytes
+        if disk and self.directory is not None:
+            if key is None:
+                keys = [name[: -len(".npz")] for name in os.listdir(self.directory) if name.endswith(".npz")]
+            for k in keys:
+                if os.path.exists(self._path(k)):
+                    os.remove(self._path(k))
+
+    def clear(self, disk: bool = False) -> None:
+        self.evict(None, disk=disk)
+
+    def _remember(self, key, bounds) -> None:
+        """Adds `bounds` to the memory tier, evicting least recently used entries to stay within the limits. Pairs
+        larger than `max_bytes` on their own are not kept in memory."""
+        size = bounds[0].nbytes + bounds[1].nbytes
+        self.evict(key)
+        if size > self.max_bytes:
+            return
+        for array in bounds:
+            array.setflags(write=False)
+        self._entries[key] = bounds
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            lower, upper = self._entries.popitem(last=False)[1]
+            self._bytes -= lower.nbytes + upper.nbytes
+
+    def _path(self, key) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+
+_DEFAULT_CACHE = None
+
+
+def default_cache() -> IntervalCache:
+    """The in-memory cache `sierra_plot` uses unless given another one."""
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = IntervalCache()
+    return _DEFAULT_CACHE
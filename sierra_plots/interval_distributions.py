@@ -0,0 +1,181 @@
+########################################################################################################################
+# Sierra Plots: interval distributions
+#
+# Registry of the distributions used to turn a point estimate and its SD into the nested confidence bands of a Sierra
+# plot. Each distribution is built once per dataset, derives whatever parameters it needs up front, and returns the
+# bounds for every requested coverage level as one (levels x time) array. Distributions with a `coverage` method also
+# give the inverse, the level of the narrowest interval reaching any x-value, which the gradient mode of a Sierra plot
+# evaluates once per pixel instead of once per level.
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+import functools
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+stats = lazy_import("scipy.stats")
+special = lazy_import("scipy.special")
+
+INTERVAL_DISTRIBUTIONS = {}
+
+
+def register_interval_distribution(name: str, factory=None):
+    """Registers an interval distribution under `name`. Can be used directly or as a class decorator.
+
+    A factory is called as ``factory(location, scale)`` with the point estimates and SDs of one dataset, and must return
+    an object whose ``interval(levels)`` method returns a (lower, upper) pair of (len(levels), len(location)) arrays.
+    """
+    if factory is None:
+        return lambda f: register_interval_distribution(name, f)
+    INTERVAL_DISTRIBUTIONS[name] = factory
+    return factory
+
+
+def get_interval_distribution(interval_func):
+    """Resolves `interval_func` to a factory. Accepts a registered name, a factory (a class, a registered factory, or
+    a functools.partial of either, e.g. ``functools.partial(TInterval, df=5)``), or a legacy per-level function with
+    the ``func(query, location, scale) -> (lower, upper)`` signature of `norm_rd`/`norm_rr`. Any other callable is
+    taken for a per-level function, so factories that are plain functions have to be registered first."""
+    if isinstance(interval_func, str):
+        try:
+            return INTERVAL_DISTRIBUTIONS[interval_func]
+        except KeyError:
+            raise ValueError(
+                f"Unknown interval distribution '{interval_func}'. Registered: {sorted(INTERVAL_DISTRIBUTIONS)}"
+            ) from None
+    if _is_factory(interval_func):
+        return interval_func
+    return lambda location, scale: PerLevelInterval(interval_func, location, scale)
+
+
+@register_interval_distribution("normal")
+class NormalInterval:
+    """Normal intervals on the scale of the estimate (risk differences). Undefined bounds (zero SD) are set to 0."""
+
+    fill_value = 0.0
+
+    def __init__(self, location, scale):
+        self.location = np.asarray(location, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+
+    def interval(self, levels):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 1)
+        lower, upper = stats.norm.interval(levels, loc=self.location, scale=self.scale)
+        return _fill(lower, self.fill_value), _fill(upper, self.fill_value)
+
+    def coverage(self, x):
+        """Level of the narrowest interval reaching each of the x-values, as a (time x len(x)) array. Missing where
+        the SD is zero."""
+        z = _distance(x, self.location, self.scale)
+        return special.erf(z / np.sqrt(2))
+
+
+@register_interval_distribution("lognormal")
+class LogNormalInterval:
+    """Normal intervals on the log scale (risk ratios). The log-scale SD is recovered from the UCL implied by
+    `scale`, once per dataset. Undefined bounds are set to 1."""
+
+    fill_value = 1.0
+
+    def __init__(self, location, scale):
+        location = np.asarray(location, dtype=float)
+        scale = np.asarray(scale, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ucl_ln = np.log((1.96 * scale) + location)
+            self.loc_ln = np.log(location)
+            self.sd_ln = (ucl_ln - self.loc_ln) / 1.96
+
+    def interval(self, levels):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 1)
+        ln_lower, ln_upper = stats.norm.interval(levels, loc=self.loc_ln, scale=self.sd_ln)
+        return _fill(np.exp(ln_lower), self.fill_value), _fill(np.exp(ln_upper), self.fill_value)
+
+    def coverage(self, x):
+        """As `NormalInterval.coverage`, on the log scale. Non-positive x-values are beyond every interval."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ln_x = np.log(np.where(np.asarray(x, dtype=float) > 0, x, 0))
+        z = _distance(ln_x, self.loc_ln, self.sd_ln)
+        return special.erf(z / np.sqrt(2))
+
+
+@register_interval_distribution("t")
+class TInterval:
+    """Student-t intervals around the estimate, using `scale` as the standard error. Defaults to 30 degrees of freedom;
+    register a ``functools.partial(TInterval, df=...)`` for other values."""
+
+    fill_value = 0.0
+
+    def __init__(self, location, scale, df: float = 30):
+        self.location = np.asarray(location, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.df = df
+
+    def interval(self, levels):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 1)
+        lower, upper = stats.t.interval(levels, self.df, loc=self.location, scale=self.scale)
+        return _fill(lower, self.fill_value), _fill(upper, self.fill_value)
+
+    def coverage(self, x):
+        """As `NormalInterval.coverage`, for the t distribution."""
+        z = _distance(x, self.location, self.scale)
+        return 1 - 2 * special.stdtr(self.df, -z)
+
+
+@register_interval_distribution("uniform")
+@register_interval_distribution("twister")
+class UniformInterval:
+    """Uniform intervals, i.e. the flat shading of a twister plot. The half-width is set so the 95% interval matches
+    the +/- 1.96 SD confidence limits; each level then covers that fraction of the half-width."""
+
+    fill_value = 0.0
+
+    def __init__(self, location, scale):
+        self.location = np.asarray(location, dtype=float)
+        self.half_width = 1.96 * np.asarray(scale, dtype=float) / 0.95
+
+    def interval(self, levels):
+        levels = np.asarray(levels, dtype=float).reshape(-1, 1)
+        lower = self.location - levels * self.half_width
+        upper = self.location + levels * self.half_width
+        return _fill(lower, self.fill_value), _fill(upper, self.fill_value)
+
+    def coverage(self, x):
+        """As `NormalInterval.coverage`. x-values beyond the half-width are only reached by the 100% interval."""
+        return np.minimum(_distance(x, self.location, self.half_width), 1.0)
+
+
+class PerLevelInterval:
+    """Adapter for user-supplied functions that compute one coverage level per call."""
+
+    def __init__(self, func, location, scale):
+        self.func = func
+        self.location = location
+        self.scale = scale
+
+    def interval(self, levels):
+        bounds = [self.func(a, location=self.location, scale=self.scale) for a in np.atleast_1d(levels)]
+        lower = np.array([np.asarray(b[0], dtype=float) for b in bounds])
+        upper = np.array([np.asarray(b[1], dtype=float) for b in bounds])
+        return lower, upper
+
+
+def _is_factory(interval_func) -> bool:
+    """Whether `interval_func` is a class, a registered factory, or a functools.partial of one."""
+    while isinstance(interval_func, functools.partial) and interval_func not in INTERVAL_DISTRIBUTIONS.values():
+        interval_func = interval_func.func
+    return isinstance(interval_func, type) or interval_func in INTERVAL_DISTRIBUTIONS.values()
+
+
+def _fill(bounds: np.ndarray, value: float) -> np.ndarray:
+    return np.where(np.isnan(bounds), value, bounds)
+
+
+def _distance(x, location: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """(time x len(x)) distances of the x-values from each location, in units of its scale. Missing for zero scales."""
+    location, scale = location[:, np.newaxis], scale[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distance = np.abs(np.asarray(x, dtype=float)[np.newaxis, :] - location) / scale
+    return np.where(scale > 0, distance, np.nan)
@@ -0,0 +1,219 @@
+########################################################################################################################
+# Sierra Plots: precomputed layouts
+#
+# A `SierraLayout` holds everything a Sierra plot draws (band bounds, step times, colors, labels and axis limits) as
+# numpy arrays and strings, so it can be computed in one process, pickled or cached cheaply, and drawn later onto any
+# matplotlib Axes with `draw_sierra` without repeating the statistics. `sierra_plot_alpha.sierra_layout` computes one.
+# A layout in gradient mode holds a raster of shades in place of the band bounds, which is drawn as a single image.
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+plt = lazy_import("matplotlib.pyplot")
+matplotlib = lazy_import("matplotlib")
+mcollections = lazy_import("matplotlib.collections")
+mcolors = lazy_import("matplotlib.colors")
+mimage = lazy_import("matplotlib.image")
+mpatches = lazy_import("matplotlib.patches")
+
+from .profiling import plot_profiler
+from .step_geometry import post_step_polygons, step_band_collection
+
+FIGSIZE = (6, 8)  # Width by height of the figure `draw_sierra` creates when given no Axes
+CMAP = "gist_gray"  # Colormap of the bands and of the gradient, by the band's SDs / 3
+
+
+class SierraLayout:
+    """Array-backed description of one Sierra plot.
+
+    Parameters
+    ----------
+    time : ndarray
+        Time of each row.
+    estimate : ndarray
+        Point estimate of each row.
+    step_time : ndarray
+        The shifted times the estimate's step line is drawn against (see `step_geometry.step_times`).
+    lower, upper : ndarray
+        (levels x time) band bounds, widest band first. Empty (0 x time) in gradient mode.
+    colors : ndarray
+        (levels x 4) RGBA color of each band.
+    labels : list
+        Legend label of each band.
+    xlim, ylim : tuple
+        Axis limits.
+    log_scale : bool
+        Whether the x-axis is logarithmic.
+    reference_line : float
+        Position of the dashed reference line.
+    xlab, ylab : str
+        Axis labels.
+    favors_label : str
+        The 'Favors ...' label on the twin x-axis.
+    favors_top : bool
+        Whether `favors_label` goes on top (True) or below `xlab` (False).
+    shade : ndarray, optional
+        Gradient mode: (rows x columns) colormap position of each pixel, i.e. its distance from the estimate in SDs
+        / 3 as for the band colors. Pixels above 1 (beyond 3 SDs) or missing are not drawn.
+    shade_x, shade_y : ndarray, optional
+        Gradient mode: the x-values of the columns and the times of the rows of `shade`.
+    """
+
+    def __init__(
+        self,
+        time,
+        estimate,
+        step_time,
+        lower,
+        upper,
+        colors,
+        labels,
+        xlim,
+        ylim,
+        log_scale=False,
+        reference_line=0.0,
+        xlab="Risk Difference",
+        ylab="Days",
+        favors_label="",
+        favors_top=True,
+        shade=None,
+        shade_x=None,
+        shade_y=None,
+    ):
+        self.time = time
+        self.estimate = estimate
+        self.step_time = step_time
+        self.lower = lower
+        self.upper = upper
+        self.colors = colors
+        self.labels = list(labels)
+        self.xlim = tuple(float(v) for v in xlim)
+        self.ylim = tuple(float(v) for v in ylim)
+        self.log_scale = log_scale
+        self.reference_line = reference_line
+        self.xlab = xlab
+        self.ylab = ylab
+        self.favors_label = favors_label
+        self.favors_top = favors_top
+        self.shade = shade
+        self.shade_x = shade_x
+        self.shade_y = shade_y
+
+    def __repr__(self) -> str:
+        return f"SierraLayout(levels={self.lower.shape[0]}, rows={self.time.size}, xlim={self.xlim})"
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.time, self.estimate, self.step_time, self.lower, self.upper, self.colors)
+        return sum(a.nbytes for a in arrays + (self.shade, self.shade_x, self.shade_y) if a is not None)
+
+    def polygons(self):
+        """Step-expanded band polygons and the band each belongs to (see `step_geometry.post_step_polygons`). They are
+        rebuilt from the bounds on demand rather than stored, which keeps layouts small."""
+        return post_step_polygons(self.time, self.lower, self.upper)
+
+
+def draw_sierra(layout: SierraLayout, ax=None, twin_axis: bool = True):
+    """Draws `layout` onto `ax`, or onto a new figure of size `FIGSIZE` when `ax` is None. Returns the axes.
+
+    Parameters
+    ----------
+    layout : SierraLayout
+        A layout from `sierra_plot_alpha.sierra_layout`.
+    ax : matplotlib axes, optional
+        Axes to draw on, e.g. one panel of a grid of subplots.
+    twin_axis : bool, optional
+        Whether to add the twin x-axis carrying the 'Favors ...' label. Grids only need it on one row of panels.
+        Defaults to True.
+
+    Returns
+    -------
+    Matplotlib axes object
+    """
+    profiler = plot_profiler("layout.draw_sierra")  # No-op unless profiling.profile_plots is active
+    profiler.figure = ax.figure if ax is not None else None
+    with profiler.phase("figure"):
+        if ax is None:
+            fig, ax = plt.subplots(figsize=FIGSIZE)  # fig_size is width by height
+        profiler.figure = ax.figure
+
+    # All bands share one set of step vertices and are drawn as a single collection, widest band first (or, in
+    # gradient mode, as one image)
+    with profiler.phase("bands"):
+        if layout.shade is not None:
+            _gradient_image(ax, layout)
+        else:
+            step_band_collection(
+                ax, layout.time, layout.lower, layout.upper, layout.colors, labels=layout.labels, alpha=1
+            )
+
+    # Step function for Risk Difference
+    with profiler.phase("step_line"):
+        ax.step(
+            layout.estimate,  # Risk Difference column
+            layout.step_time,  # time column (shift is to make sure steps occur at correct t
+            color="w",  # Sets the color of the line (k=black)
+            where="post",
+            lw=0.5,
+        )
+
+    # Draw reference
+    with profiler.phase("reference"):
+        ax.vlines(
+            layout.reference_line,
+            0,
+            layout.ylim[1],
+            colors="black",  # Sets color to gray for the reference line
+            linestyles="--",  # Sets the reference line as dashed
+            label=None,
+        )  # drawing dashed reference line at RD=0
+
+    with profiler.phase("twin_axis"):
+        if twin_axis:
+            _favors_axis(ax, layout.favors_label, layout.favors_top)
+
+    with profiler.phase("limits"):
+        ax.set_ylim(layout.ylim)  # Sets the min and max of the y-axis
+        ax.set_ylabel(layout.ylab)  # Sets the y-label
+        if layout.log_scale:
+            ax.set_xscale("log")
+        ax.set_xlim(layout.xlim)  # Sets the min and max of the x-axis
+        ax.set_xlabel(
+            layout.xlab,  # Sets the x-axis main label (bottom label)
+            fontdict={
+                "size": 11,  # "weight": "bold"
+            },
+        )
+    return ax
+
+
+def _gradient_image(ax, layout: SierraLayout):
+    """Draws the shades of a gradient layout as one image, with a legend entry for each band color as in band mode."""
+    cmap = matplotlib.colormaps[CMAP].with_extremes(over=(0, 0, 0, 0), bad=(0, 0, 0, 0))  # Beyond 3 SDs: nothing
+    # Rows and columns are looked up by nearest center, which keeps the steps sharp whatever the axis scale
+    image = mimage.NonUniformImage(ax, interpolation="nearest", cmap=cmap, norm=mcolors.Normalize(0, 1))
+    image.set_data(layout.shade_x, layout.shade_y, layout.shade)
+    ax.add_image(image)
+    # The lookup repeats the edge rows and columns over the rest of the axes, e.g. when panels share wider limits
+    (x0, x1), (y0, y1) = layout.shade_x[[0, -1]], layout.shade_y[[0, -1]]
+    image.set_clip_path(mpatches.Rectangle((x0, y0), x1 - x0, y1 - y0, transform=ax.transData))
+    for color, label in zip(layout.colors, layout.labels):
+        ax.add_collection(mcollections.PolyCollection([], color=color[np.newaxis], label=label, alpha=1), autolim=False)
+    return image
+
+
+def _favors_axis(ax, label: str, top: bool = True):
+    """Twin x-axis carrying the 'Favors ...' label above the plot, or below the x-axis label when `top` is False."""
+    ax2 = ax.twiny()  # Duplicate the x-axis to create a separate label
+    ax2.set_xlabel(label, fontdict={"size": 10})  # Top x-axes label for 'favors'
+    ax2.set_xticks([])  # Removes top x-axes tick marks
+    # Option to add the 'favors' label below the first x-axes label
+    if not top:
+        ax2.xaxis.set_ticks_position("bottom")
+        ax2.xaxis.set_label_position("bottom")
+        ax2.spines["bottom"].set_position(("outward", 36))
+    return ax2
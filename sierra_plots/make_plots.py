@@ -1,79 +1,93 @@
-import pandas as pd
+########################################################################################################################
+# Sierra Plots: example figures
+#
+# Run from the repository root: python -m sierra_plots.make_plots
+# For many figures at once, see sierra_plots/batch_plots.py.
+########################################################################################################################
+
 import matplotlib.pyplot as plt
 
-from sierra_plot_alpha import sierra_plot, norm_rd, norm_rr
+from .estimates_io import read_estimates
+from .sierra_plot_alpha import sierra_plot, norm_rd, norm_rr
+
+
+def main():
+    ##########################
+    # Setup data
+    # Reading in data
+    columns = ["t", "RD", "RD_LCL", "RD_UCL", "RD_LCL_fake", "RD_UCL_fake", "RR", "RR_LCL", "RR_UCL"]
+    data = read_estimates("fake_data.csv", columns)  # Only the plotted columns, as floats
+
+    ##########################
+    # Example: Difference
+    ax = sierra_plot(
+        data,
+        xvar="RD",
+        lcl="RD_LCL_fake",
+        ucl="RD_UCL_fake",
+        yvar="t",
+        treat_labs=["Vaccine", "Placebo"],
+        interval_func=norm_rd,
+    )
 
-##########################
-# Setup data
-# Reading in data
-data = pd.read_csv("fake_data.csv")  # .csv read in and managed using pandas
+    # Formatting the axes and labels
+    ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
 
-##########################
-# Example: Difference
-ax = sierra_plot(
-    data,
-    xvar="RD",
-    lcl="RD_LCL_fake",
-    ucl="RD_UCL_fake",
-    yvar="t",
-    treat_labs=["Vaccine", "Placebo"],
-    interval_func=norm_rd,
-)
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    plt.savefig(
+        "sierra_plot_python_rd.png", format="png", dpi=600
+    )  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
 
-# Formatting the axes and labels
-ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+    # ##########################
+    # # Example: Ratio
+    ax = sierra_plot(
+        data,
+        xvar="RR",
+        lcl="RR_LCL",
+        ucl="RR_UCL",
+        yvar="t",
+        reference_line=1.0,
+        log_scale=True,
+        treat_labs=["Vaccine", "Placebo"],
+        interval_func=norm_rr,
+    )
 
-plt.tight_layout()  # Sets spacing of the border of the plot
-plt.savefig(
-    "sierra_plot_python_rd.png", format="png", dpi=600
-)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
+    # Formatting the axes and labels
+    ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+    ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
+    ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
 
-# ##########################
-# # Example: Ratio
-ax = sierra_plot(
-    data,
-    xvar="RR",
-    lcl="RR_LCL",
-    ucl="RR_UCL",
-    yvar="t",
-    reference_line=1.0,
-    log_scale=True,
-    treat_labs=["Vaccine", "Placebo"],
-    interval_func=norm_rr,
-)
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    plt.savefig(
+        "sierra_plot_python_rr.png", format="png", dpi=600
+    )  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
 
-# Formatting the axes and labels
-ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
-ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
+    ##########################
+    # Example: "True" RD
+    ax = sierra_plot(
+        data,
+        xvar="RD",
+        lcl="RD_LCL",
+        ucl="RD_UCL",
+        yvar="t",
+        treat_labs=["Vaccine", "Placebo"],
+        interval_func=norm_rd,
+    )
 
-plt.tight_layout()  # Sets spacing of the border of the plot
-plt.savefig(
-    "sierra_plot_python_rr.png", format="png", dpi=600
-)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
+    # Formatting the axes and labels
+    ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
 
-##########################
-# Example: "True" RD
-ax = sierra_plot(
-    data,
-    xvar="RD",
-    lcl="RD_LCL",
-    ucl="RD_UCL",
-    yvar="t",
-    treat_labs=["Vaccine", "Placebo"],
-    interval_func=norm_rd,
-)
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    plt.savefig(
+        "sierra_plot_python.png", format="png", dpi=600
+    )  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
 
-# Formatting the axes and labels
-ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
 
-plt.tight_layout()  # Sets spacing of the border of the plot
-plt.savefig(
-    "sierra_plot_python.png", format="png", dpi=600
-)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
+if __name__ == "__main__":
+    main()
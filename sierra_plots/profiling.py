@@ -0,0 +1,160 @@
+########################################################################################################################
+# Sierra / Twister Plots: profiling hooks
+#
+# Opt-in, per-phase instrumentation of the plotting functions. Inside a `profile_plots()` block (or while a listener is
+# registered with `add_listener`) every plot call reports one record per phase with its wall time, the artists it
+# added and, optionally, the memory it allocated. With no listener the plot functions get a shared no-op profiler, so
+# the hooks cost a function call per phase and nothing else.
+#
+#   with profile_plots() as profile:
+#       ax = sierra_plot(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+#   print(profile.table())
+########################################################################################################################
+
+# Importing required dependencies
+import contextlib
+import itertools
+import time
+
+# tracemalloc is imported where it is used: it takes longer to import than the rest of the package
+
+_LISTENERS = []  # Callables receiving each phase record, see `add_listener`
+_CALLS = itertools.count()  # Numbers each profiled plot call, so phases can be grouped per call
+
+
+def add_listener(listener) -> None:
+    """Registers `listener`, a callable that receives one dictionary per plot phase with keys plot, call, phase,
+    seconds, artists, allocated and peak (bytes, None unless memory is traced)."""
+    _LISTENERS.append(listener)
+
+
+def remove_listener(listener) -> None:
+    _LISTENERS.remove(listener)
+
+
+class PlotProfile:
+    """Collects the phase records of every plot call made while it is listening."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record: dict) -> None:
+        self.records.append(record)
+
+    def table(self):
+        """The records as a pandas DataFrame, one row per phase of each plot call."""
+        import pandas as pd
+
+        return pd.DataFrame(self.records, columns=["plot", "call", "phase", "seconds", "artists", "allocated", "peak"])
+
+    def summary(self):
+        """Total time, artists and allocation per plot function and phase, across calls, slowest phases first."""
+        table = self.table()
+        grouped = table.groupby(["plot", "phase"], sort=False)
+        summary = grouped.agg(
+            calls=("call", "nunique"),
+            seconds=("seconds", "sum"),
+            artists=("artists", "sum"),
+            allocated=("allocated", "sum"),
+            peak=("peak", "max"),
+        )
+        return summary.sort_values("seconds", ascending=False)
+
+
+@contextlib.contextmanager
+def profile_plots(callback=None, memory: bool = False):
+    """Profiles every plot call made inside the block.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Also called with each phase record as it is produced, e.g. to log slow phases of a batch run.
+    memory : bool, optional
+        Trace allocations with tracemalloc, which slows plotting down noticeably. Defaults to False.
+
+    Returns
+    -------
+    PlotProfile holding the records of the block
+    """
+    import tracemalloc
+
+    profile = PlotProfile()
+    listeners = [profile] + ([callback] if callback is not None else [])
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    for listener in listeners:
+        add_listener(listener)
+    try:
+        yield profile
+    finally:
+        for listener in listeners:
+            remove_listener(listener)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def plot_profiler(plot: str):
+    """Profiler for one call of the plot function `plot`. Returns the no-op profiler when nobody is listening."""
+    if not _LISTENERS:
+        return _DISABLED
+    return _PlotProfiler(plot, next(_CALLS), list(_LISTENERS))
+
+
+class _PlotProfiler:
+    """Times the phases of one plot call. Set `figure` once it exists so the phases can count the artists they add."""
+
+    def __init__(self, plot: str, call: int, listeners: list):
+        self.plot = plot
+        self.call = call
+        self.listeners = listeners
+        self.figure = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        import tracemalloc
+
+        artists = self._artists()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            allocated = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            record = {
+                "plot": self.plot,
+                "call": self.call,
+                "phase": name,
+                "seconds": seconds,
+                "artists": self._artists() - artists,
+                "allocated": None,
+                "peak": None,
+            }
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record["allocated"], record["peak"] = current - allocated, peak - allocated
+            for listener in self.listeners:
+                listener(record)
+
+    def _artists(self) -> int:
+        # Artists directly on the figure's axes (collections, lines, patches, texts, ...), not their sub-artists
+        return sum(len(ax.get_children()) for ax in self.figure.axes) if self.figure is not None else 0
+
+
+class _DisabledProfiler:
+    """Stand-in used when profiling is off: every phase is the same reusable no-op context manager."""
+
+    figure = None
+    _null = contextlib.nullcontext()
+
+    def phase(self, name: str):
+        return self._null
+
+    def __setattr__(self, name, value):
+        pass  # Ignore `figure` and friends
+
+
+_DISABLED = _DisabledProfiler()
@@ -5,15 +5,20 @@
 ########################################################################################################################
 
 # Importing required dependencies
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-from scipy.stats import norm
-import seaborn as sns
+from __future__ import annotations
 
 from typing import Union, Tuple  # Import union, tuple type hinting
 
+from ._lazy import lazy_import
+from .density_grid import STEP, CHUNK_ROWS, WINDOW_SD, SparseDensity, centered_grid, density_grid, sparse_density_grid
+from .step_geometry import step_times
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+stats = lazy_import("scipy.stats")
+mcolors = lazy_import("matplotlib.colors")
+
 
 # TODO:
 # New approach: rectangles between midpoint and 95%, mid and 5%.
@@ -27,7 +32,6 @@ def step_normal(data, xvar: str, lcl: str, ucl: str):
     pass
 
 
-STEP = 500
 ##########################
 # Sierra Plot coloring function - given a set of axes, plot coloring proportional to UCL - LCL over each Time (T) interval.
 # Adapted from https://stackoverflow.com/questions/18215276/how-to-fill-rainbow-color-under-a-curve-in-python-matplotlib?lq=1
@@ -38,38 +42,87 @@ def sierra_coloring(
     lcl: str = None,
     ucl: str = None,
     yvar: str = None,
+    chunk_rows: int = CHUNK_ROWS,
+    adaptive: bool = False,
+    window_sd: float = WINDOW_SD,
 ):
+    """Density of each time row over a grid of 2 * STEP x-values centered on zero, as a (time x 2 * STEP) matrix.
+    With `adaptive`, only the x-values within `window_sd` SDs of each row's estimate are evaluated and a
+    `density_grid.SparseDensity` is returned instead, which `plot_heatmap` expands when drawing. For long trials with
+    narrow intervals this is a fraction of the time and memory."""
     y_size = int(np.max(data[yvar])) + 1  # TODO:WHY PLUS 1?
-    l_width, u_width = np.min(data[lcl]), np.max(data[ucl])  # get maximum width
-    step = np.max(np.abs([l_width, u_width])) / (
-        STEP - 100
-    )  # get step between each point, map so 0 at center, 2 STD=400 steps captures most space
+    x, columns, _ = centered_grid(data[lcl], data[ucl])
+
+    sd = (data[ucl] - data[xvar]) / 1.96  # dumbass estimator for SD
+    if adaptive:
+        return sparse_density_grid(
+            data[xvar],
+            sd,
+            x,
+            shape=(y_size, 2 * STEP),
+            rows=data.index.to_numpy(),
+            columns=columns,
+            window_sd=window_sd,
+            chunk_rows=chunk_rows,
+        )
 
     # Always will be twice as tall as wide
     # Why 600? -300 to cover 3 STD below, 300 to cover 3 STD above.
     d = np.zeros(shape=(y_size, 2 * STEP))
-    for index, row in data.iterrows():
-
-        loca = row[xvar]
-        sd = (row[ucl] - row[xvar]) / 1.96  # dumbass estimator for SD
-        print(f"index={index}, loca={loca}, sd={sd}")
-        for i in np.arange(-1 * STEP * step, STEP * step, step):
-            n = norm(loc=loca, scale=sd).pdf(i)
-            rownum = int(i / step) + STEP
-            d[index][rownum] = n if n < 100 else 100
-
-    # Initialize array to right size
-    # Take mapped x,y value and output a color density
+
+    # Take mapped x,y value and output a color density, evaluated block by block of time rows
+    density_grid(
+        data[xvar],
+        sd,
+        x,
+        out=d,
+        rows=data.index.to_numpy(),
+        columns=columns,
+        chunk_rows=chunk_rows,
+    )
     # Plot that density, then plot the black line above it
     return d
 
 
-def plot_heatmap(array: np.array):
-    ax = sns.heatmap(array, cmap="Greys")
-    ax.invert_yaxis()
+def plot_heatmap(
+    array: Union[np.array, SparseDensity],
+    step: float = 1.0,
+    reference_line: float = 0.0,
+    cmap="Greys",
+    ax=None,
+):
+    """Draws a density matrix from `sierra_coloring` as a single image. Column `STEP` of the matrix is x = 0 and the
+    columns are `step` apart, so with the grid spacing from `density_grid.centered_grid` the x-axis is in risk
+    difference units. Row i covers time i to i + 1.
+
+    Parameters
+    ----------
+    array : numpy array, SparseDensity
+        (time x 2 * STEP) density matrix, or the sparse result of `sierra_coloring(..., adaptive=True)`.
+    step : float, optional
+        Spacing of the x-grid. Defaults to 1, which labels the x-axis in columns from the center.
+    reference_line : float, optional
+        Position of the dashed reference line. Defaults to 0.
+    cmap : str, optional
+        Matplotlib colormap. Defaults to "Greys".
+    ax : matplotlib axes, optional
+        Axes to draw on. Defaults to the current axes.
+
+    Returns
+    -------
+    Matplotlib axes object
+    """
+    if ax is None:
+        ax = plt.gca()
+    if isinstance(array, SparseDensity):
+        array = array.toarray(dtype=np.float32)  # Only expanded now, at half the size of the dense float64 matrix
+    array = np.asarray(array)
+    norm = mcolors.Normalize(vmin=np.nanmin(array), vmax=np.nanmax(array))
+    image = heatmap_image(ax, array, step=step, cmap=cmap, norm=norm)
+    ax.figure.colorbar(image, ax=ax)
 
     ax.vlines(
-        STEP,
+        reference_line,
         0,
         len(array),
         colors="black",  # Sets color to gray for the reference line
@@ -80,6 +133,17 @@ def plot_heatmap(array: np.array):
     return ax
 
 
+def heatmap_image(ax, array, step: float = 1.0, first_row: int = 0, cmap="Greys", norm=None):
+    """Draws the rows of a density matrix as one image whose bottom row is time row `first_row`, with the x-axis of
+    `plot_heatmap`. Returns the AxesImage."""
+    # Cell centers sit on the grid x-values, (column - STEP) * step
+    extent = ((-STEP - 0.5) * step, (array.shape[1] - STEP - 0.5) * step, first_row, first_row + array.shape[0])
+    # Densities are resampled to the output pixels before color mapping, so only those pixels are normalized and mapped
+    return ax.imshow(
+        array, cmap=cmap, norm=norm, extent=extent, origin="lower", aspect="auto", interpolation_stage="data"
+    )
+
+
 def sierra_plot(
     data,
     xvar,
@@ -155,23 +219,22 @@ def sierra_plot(
     # Get colormap to draw with
     gradient = "gist_yarg"
     cmap = plt.get_cmap(gradient)
+    time = step_times(data[yvar])  # Shifted once, shared by every line
     # loop through as many steps as needed
     for i in np.arange(start=0.05, stop=0.5, step=0.45 / STEP):
         # Get PPF to arrange lines
-        df[i] = norm(loc=df[xvar], scale=df["sd"]).ppf(i)
-        ax.step(df[i], data[yvar].shift(-1).ffill(), color=cmap(i), where="post")
+        df[i] = stats.norm(loc=df[xvar], scale=df["sd"]).ppf(i)
+        ax.step(df[i], time, color=cmap(i), where="post")
 
     for i in np.arange(start=0.95, stop=0.5, step=-0.45 / STEP):
         # Get PPF to arrange lines
-        df[i] = norm(loc=df[xvar], scale=df["sd"]).ppf(i)
-        ax.step(df[i], data[yvar].shift(-1).ffill(), color=cmap(1 - i), where="post")
+        df[i] = stats.norm(loc=df[xvar], scale=df["sd"]).ppf(i)
+        ax.step(df[i], time, color=cmap(1 - i), where="post")
     # Dummy way - can optimize later
     # Step function for Risk Difference
     ax.step(
         data[xvar],  # Risk Difference column
-        data[yvar]
-        .shift(-1)
-        .ffill(),  # time column (shift is to make sure steps occur at correct t
+        time,  # time column (shift is to make sure steps occur at correct t
         # label="RD",  # Sets the label in the legend
         color="k",  # Sets the color of the line (k=black)
         # alpha=0.2, # Alpha for line as needed?
@@ -218,7 +281,7 @@ def sierra_plot(
     ax.set_ylabel(ylab)  # Sets the y-label
     if log_scale:
         ax.set_xscale("log")
-        xlimit = np.max(
+        xlimit = np.nanmax(
             [np.abs(np.log(data[lcl])), np.abs(np.log(data[ucl]))]
         )  # Extract the x-limits to use
         spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
@@ -226,7 +289,7 @@ def sierra_plot(
             [np.exp(-xlimit - spacing), np.exp(xlimit + spacing)]
         )  # Sets the min and max of the x-axis
     else:
-        xlimit = np.max(
+        xlimit = np.nanmax(
             [np.abs(data[lcl]), np.abs(data[ucl])]
         )  # Extract the x-limits to use
         spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
@@ -244,45 +307,53 @@ def sierra_plot(
 
 
 ##########################
-# Setup data
-# Reading in data
-data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
-
-colordata = sierra_coloring(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
-ax = plot_heatmap(colordata)
-
-##########################
-# Example: Difference
-# ax = sierra_plot(
-#     data,
-#     xvar="RD",
-#     lcl="RD_LCL",
-#     ucl="RD_UCL",
-#     yvar="t",
-#     treat_labs=["Vaccine", "Placebo"],
-# )
-
-# Formatting the axes and labels
-ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-
-plt.tight_layout()  # Sets spacing of the border of the plot
-plt.savefig(
-    "sierra_plot_python.png", format="png", dpi=600
-)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
-
-# ##########################
-# # Example: Ratio
-# ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
-#                   reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
-
-# # Formatting the axes and labels
-# ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
-# ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-# ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
-# ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
-
-# plt.tight_layout()  # Sets spacing of the border of the plot
-# # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
-# plt.show()  # displays the generated image
+# Example (python -m sierra_plots.sierra_heatmap, from the repository root)
+def main():
+    ##########################
+    # Setup data
+    # Reading in data
+    data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
+
+    colordata = sierra_coloring(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+    _, _, step = centered_grid(data["RD_LCL"], data["RD_UCL"])  # x-spacing of the columns, for an RD axis
+    ax = plot_heatmap(colordata, step=step)
+
+    ##########################
+    # Example: Difference
+    # ax = sierra_plot(
+    #     data,
+    #     xvar="RD",
+    #     lcl="RD_LCL",
+    #     ucl="RD_UCL",
+    #     yvar="t",
+    #     treat_labs=["Vaccine", "Placebo"],
+    # )
+
+    # Formatting the axes and labels
+    ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    plt.savefig(
+        "sierra_plot_python.png", format="png", dpi=600
+    )  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
+
+    # ##########################
+    # # Example: Ratio
+    # ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
+    #                   reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
+
+    # # Formatting the axes and labels
+    # ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
+    # ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+    # ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
+    # ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
+
+    # plt.tight_layout()  # Sets spacing of the border of the plot
+    # # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
+    # plt.show()  # displays the generated image
+
+
+if __name__ == "__main__":
+    main()
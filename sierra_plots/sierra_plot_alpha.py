@@ -6,11 +6,25 @@
 ########################################################################################################################
 
 # Importing required dependencies
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-from scipy.stats import norm, lognorm
+from __future__ import annotations
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+matplotlib = lazy_import("matplotlib")
+special = lazy_import("scipy.special")
+
+from .interval_cache import default_cache, interval_key
+from .layout import CMAP, SierraLayout, draw_sierra
+from .profiling import plot_profiler
+from .step_geometry import decimate_steps, step_raster_rows, step_times
+from .interval_distributions import (
+    NormalInterval,
+    LogNormalInterval,
+    get_interval_distribution,
+)
 
 sd_dict = {
     0.997300203936740: 3.0,
@@ -25,31 +39,22 @@ def norm_rd(
     query: float, location: pd.Series, scale: pd.Series
 ) -> tuple[pd.Series, pd.Series]:  # something up with type hinting right now
 
-    (q0, q1) = norm.interval(query, loc=location, scale=scale)
-    pd_q0 = pd.Series(q0).fillna(0)
-    pd_q1 = pd.Series(q1).fillna(0)
-    return pd_q0, pd_q1
+    (q0, q1) = NormalInterval(location, scale).interval(query)
+    return pd.Series(q0[0]), pd.Series(q1[0])
 
 
 # Function that takes a query point and returns LCL and UCL for that percentile based on a risk-difference distribution (lognormal)
 def norm_rr(
     query: float, location: pd.Series, scale: pd.Series
 ) -> tuple[pd.Series, pd.Series]:  # something up with type hinting right now
-    # There is 100% a way to do this with lognormal, but I do not know enough.
-    # Extract information from given location and bastardized "sd"
-    df = pd.DataFrame()
-    df["ucl"] = (1.96 * scale) + location
-    # Define natural log of values, which then makes this into normal
-    df["ucl_ln"] = np.log(df["ucl"])
-    df["loc_ln"] = np.log(location)
-    df["sd_ln"] = (df["ucl_ln"] - df["loc_ln"]) / 1.96
-
-    # get the interval based on the p-value given by query
-    (ln_q0, ln_q1) = norm.interval(query, loc=df["loc_ln"], scale=df["sd_ln"])
-    # Since the above interval is given in terms of the log, raise e^{lower, upper} to get true value
-    pd_q0 = pd.Series(np.exp(ln_q0)).fillna(1)
-    pd_q1 = pd.Series(np.exp(ln_q1)).fillna(1)
-    return pd_q0, pd_q1
+    # The log-scale SD is recovered from the UCL implied by the bastardized "sd", see LogNormalInterval
+    (q0, q1) = LogNormalInterval(location, scale).interval(query)
+    return pd.Series(q0[0]), pd.Series(q1[0])
+
+
+# sierra_plot computes every level in one call, so the per-level functions above map onto their registered equivalents
+LEGACY_INTERVAL_FUNCS = {norm_rd: "normal", norm_rr: "lognormal"}
+RASTER = (2048, 1024)  # Most rows and the columns of the raster shaded in gradient mode
 
 
 ##########################
@@ -67,6 +72,11 @@ def sierra_plot(
     treat_labs_top=True,
     treat_labs_spacing="\t\t\t",
     interval_func=norm_rd,
+    cache=True,
+    max_vertices=None,
+    gradient=False,
+    raster=RASTER,
+    ax=None,
 ):
     """Function to generate a twister plot from input data. Returns matplotlib axes which can have xlims and ylims
     set to the desired levels.
@@ -94,6 +104,28 @@ def sierra_plot(
         Whether to place the `treat_labs` at the top (True) or bottom (False). Defaults to True.
     treat_labs_spacing : str, optional
         Spacing to use between the treatment group names.
+    interval_func : str, callable, optional
+        Distribution used for the nested bands: a name registered in `interval_distributions` ("normal", "lognormal",
+        "t", "uniform", ...), a registered factory, or a per-level function like `norm_rd`. Defaults to `norm_rd`.
+    cache : bool, IntervalCache, optional
+        Where to memoize the band matrices, keyed by a hash of the estimates, SDs, distribution and levels, so that
+        re-rendering the same data with different styling skips the statistics. True (default) uses the shared
+        in-memory `interval_cache.default_cache()`, False always recomputes.
+    max_vertices : int, optional
+        Most vertices drawn per band and for the step line. Longer step functions are thinned with
+        `step_geometry.decimate_steps`, which keeps their extremes and interval envelopes, so drawing time and file size
+        stay bounded. About 16 times the plot's height in pixels keeps the picture unchanged. Defaults to None (every
+        row is drawn).
+    gradient : bool, optional
+        Shade continuously instead of drawing the nested bands: every pixel of a (time x x-value) raster is colored by
+        the level of the narrowest interval reaching it, from the distribution's `coverage` method, and the raster is
+        drawn as one image. The cost is that of one evaluation per pixel, however fine the gradient. Needs a
+        distribution with a `coverage` method (all registered ones have one). Defaults to False.
+    raster : tuple, optional
+        Most rows and the number of columns of the gradient raster, which spans the plot's x-limits. Defaults to
+        `RASTER`.
+    ax : matplotlib axes, optional
+        Axes to draw on, e.g. a panel of `grid.plot_grid`. Defaults to a new 6 x 8 figure.
 
     Returns
     -------
@@ -110,97 +142,154 @@ def sierra_plot(
     >>> plt.show()  # displays the generated image
 
     """
-    max_t = data[yvar].max()  # Extract max y value for the plot
+    layout = sierra_layout(
+        data,
+        xvar,
+        lcl,
+        ucl,
+        yvar,
+        xlab=xlab,
+        ylab=ylab,
+        log_scale=log_scale,
+        reference_line=reference_line,
+        treat_labs=treat_labs,
+        treat_labs_top=treat_labs_top,
+        treat_labs_spacing=treat_labs_spacing,
+        interval_func=interval_func,
+        cache=cache,
+        max_vertices=max_vertices,
+        gradient=gradient,
+        raster=raster,
+    )
+    return draw_sierra(layout, ax=ax)
+
+
+##########################
+def sierra_layout(
+    data,
+    xvar,
+    lcl,
+    ucl,
+    yvar,
+    xlab="Risk Difference",
+    ylab="Days",
+    log_scale=False,
+    reference_line=0.0,
+    treat_labs=("Treatment", "Placebo"),
+    treat_labs_top=True,
+    treat_labs_spacing="\t\t\t",
+    interval_func=norm_rd,
+    cache=True,
+    max_vertices=None,
+    gradient=False,
+    raster=RASTER,
+) -> SierraLayout:
+    """Computes everything `sierra_plot` draws, without drawing it. The parameters are those of `sierra_plot`. The
+    returned `SierraLayout` holds only arrays and strings, so it can be built in a worker process, pickled, and drawn
+    onto any Axes with `layout.draw_sierra`.
+
+    Examples
+    --------
+
+    >>> layout = sierra_layout(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t")
+    >>> fig, axes = plt.subplots(1, 2, figsize=(12, 8))
+    >>> draw_sierra(layout, ax=axes[0])
+
+    """
+    profiler = plot_profiler("sierra_plot_alpha.sierra_layout")  # No-op unless profiling.profile_plots is active
 
-    # Initializing plot
-    fig, ax = plt.subplots(figsize=(6, 8))  # fig_size is width by height
-    # Place reference line at end
     # Prep data for plotting; p
-    df = pd.DataFrame()
-    df[yvar] = data[yvar]
-    df[xvar] = data[xvar]
-    # Get standard deviation of each column
-    df["sd"] = (data[ucl] - data[xvar]) / 1.96
-
-    # loop through as many steps as needed
-    cmap = plt.get_cmap("gist_gray")
-    # # # Functionally not needed, but helps Shaded step function for Risk Difference confidence intervals
-
-    # for a in np.arange(0.999, 0.001, STEP):
-    for a in sd_dict.keys():
-        (df[a], df[2 - a]) = interval_func(a, location=df[xvar], scale=df["sd"])
-        ax.fill_betweenx(
-            df[yvar],
-            df[2 - a],
-            df[a],
-            color=cmap(sd_dict[a] / 3),
-            alpha=1,
-            label=f"{100 * a: 2.2f}% CI ({sd_dict[a]} SEs)",
-            step="post",
-        )
-
-    # Step function for Risk Difference
-    ax.step(
-        data[xvar],  # Risk Difference column
-        data[yvar]
-        .shift(-1)
-        .ffill(),  # time column (shift is to make sure steps occur at correct t
-        # label="RD",  # Sets the label in the legend
-        color="w",  # Sets the color of the line (k=black)
-        where="post",
-        lw=0.5,
-    )
+    with profiler.phase("sd"):
+        time = data[yvar].to_numpy(dtype=float)
+        location = data[xvar].to_numpy(dtype=float)
+        # Get standard deviation of each column
+        sd = (data[ucl].to_numpy(dtype=float) - location) / 1.96
 
-    # Draw reference
-    ax.vlines(
-        reference_line,
-        0,
-        max_t,
-        colors="black",  # Sets color to gray for the reference line
-        linestyles="--",  # Sets the reference line as dashed
-        label=None,
-    )  # drawing dashed reference line at RD=0
-
-    ax2 = ax.twiny()  # Duplicate the x-axis to create a separate label
-    ax2.set_xlabel(
-        "Favors "
+    # Every level's bounds come from a single (levels x time) evaluation
+    with profiler.phase("intervals"):
+        levels = np.fromiter(sd_dict.keys(), dtype=float)
+        distribution = LEGACY_INTERVAL_FUNCS.get(interval_func, interval_func)
+        factory = get_interval_distribution(distribution)
+        if gradient:
+            (lower, upper) = np.empty(shape=(2, 0, time.size))  # No bands, see the gradient phase below
+        elif cache is False:
+            (lower, upper) = factory(location, sd).interval(levels)
+        else:
+            (lower, upper) = (default_cache() if cache is True else cache).get_or_compute(
+                interval_key(location, sd, distribution, levels),
+                lambda: factory(location, sd).interval(levels),
+            )
+
+    with profiler.phase("limits"):
+        max_t = np.nanmax(time)  # Extract max y value for the plot
+        xlimit = x_extent(data[lcl].to_numpy(dtype=float), data[ucl].to_numpy(dtype=float), log_scale)
+        xlim = x_limits(xlimit, log_scale)
+
+    shade = shade_x = shade_y = None
+    if gradient:
+        with profiler.phase("gradient"):
+            (shade_x, shade_y, shade) = coverage_raster(factory, time, location, sd, xlim, raster, log_scale)
+
+    if max_vertices is not None:
+        with profiler.phase("decimate"):
+            (time, location, lower, upper) = decimate_steps(time, location, lower, upper, max_vertices)
+
+    cmap = matplotlib.colormaps[CMAP]
+    return SierraLayout(
+        time=time,
+        estimate=location,
+        step_time=step_times(time),
+        lower=lower,
+        upper=upper,
+        colors=cmap(np.fromiter(sd_dict.values(), dtype=float) / 3),
+        labels=[f"{100 * a: 2.2f}% CI ({sd_dict[a]} SEs)" for a in sd_dict.keys()],
+        xlim=xlim,
+        ylim=(0, max_t),
+        log_scale=log_scale,
+        reference_line=reference_line,
+        xlab=xlab,
+        ylab=ylab,
+        favors_label="Favors "
         + treat_labs[0]
         + treat_labs_spacing.expandtabs()
         + "Favors "  # Manually create some custom spacing
         + treat_labs[1],  # Top x-axes label for 'favors'
-        fontdict={"size": 10},
+        favors_top=treat_labs_top,
+        shade=shade,
+        shade_x=shade_x,
+        shade_y=shade_y,
     )
-    ax2.set_xticks([])  # Removes top x-axes tick marks
-    # Option to add the 'favors' label below the first x-axes label
-    if not treat_labs_top:
-        ax2.xaxis.set_ticks_position("bottom")
-        ax2.xaxis.set_label_position("bottom")
-        ax2.spines["bottom"].set_position(("outward", 36))
-
-    ax.set_ylim([0, max_t])  # Sets the min and max of the y-axis
-    ax.set_ylabel(ylab)  # Sets the y-label
+
+
+def coverage_raster(factory, time, location, scale, xlim, raster=RASTER, log_scale=False) -> tuple:
+    """Shades of the gradient mode: the level of the narrowest interval reaching each pixel, as the distance in SDs
+    of a normal interval of that level, / 3 like the band colors. Columns are evenly spaced on the axis scale; rows
+    follow `step_geometry.step_raster_rows`.
+
+    Returns
+    -------
+    The x-values of the columns, the times of the rows, and the (rows x columns) float32 shades
+    """
+    x = np.geomspace(*xlim, raster[1]) if log_scale else np.linspace(*xlim, raster[1])
+    y, row = step_raster_rows(time, raster[0])
+    distribution = factory(location[row], scale[row])  # One "time" per raster row
+    if not hasattr(distribution, "coverage"):
+        raise ValueError(f"The gradient mode needs an interval distribution with a coverage method, not {factory}")
+    coverage = distribution.coverage(x)
+    shade = special.ndtri((1 + coverage) / 2) / max(sd_dict.values())
+    return x, y, shade.astype(np.float32)
+
+
+def x_extent(lower_limit, upper_limit, log_scale=False) -> float:
+    """Largest distance of a confidence limit from the null (0, or 1 on the log scale), in x-axis units."""
     if log_scale:
-        ax.set_xscale("log")
-        xlimit = np.max(
-            [np.abs(np.log(data[lcl])), np.abs(np.log(data[ucl]))]
-        )  # Extract the x-limits to use
-        spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
-        ax.set_xlim(
-            [np.exp(-xlimit - spacing), np.exp(xlimit + spacing)]
-        )  # Sets the min and max of the x-axis
-    else:
-        xlimit = np.max(
-            [np.abs(data[lcl]), np.abs(data[ucl])]
-        )  # Extract the x-limits to use
-        spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
-        ax.set_xlim(
-            [-xlimit - spacing, xlimit + spacing]
-        )  # Sets the min and max of the x-axis
-
-    ax.set_xlabel(
-        xlab,  # Sets the x-axis main label (bottom label)
-        fontdict={
-            "size": 11,  # "weight": "bold"
-        },
-    )
-    return ax
+        return np.nanmax([np.abs(np.log(lower_limit)), np.abs(np.log(upper_limit))])  # Extract the x-limits to use
+    return np.nanmax([np.abs(lower_limit), np.abs(upper_limit)])  # Extract the x-limits to use
+
+
+def x_limits(xlimit: float, log_scale=False) -> tuple:
+    """Symmetric x-axis limits around the null for an `x_extent` of `xlimit`."""
+    spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
+    if log_scale:
+        return (np.exp(-xlimit - spacing), np.exp(xlimit + spacing))
+    return (-xlimit - spacing, xlimit + spacing)
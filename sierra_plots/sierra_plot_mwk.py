@@ -5,13 +5,18 @@
 ########################################################################################################################
 
 # Importing required dependencies
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-from scipy.stats import norm
+from __future__ import annotations
 
-from typing import Union, Tuple  # Import union, tuple type hinting
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+matplotlib = lazy_import("matplotlib")
+mcollections = lazy_import("matplotlib.collections")
+stats = lazy_import("scipy.stats")
+
+from .step_geometry import decimate_steps, step_times, post_step_segments
 
 
 # TODO:
@@ -20,13 +25,14 @@ from typing import Union, Tuple  # Import union, tuple type hinting
 # Boom. Sierra Plot.
 
 ##########################
-# polygon function - draws a PLT polygon at given coordinates.
-# Adapted from https://stackoverflow.com/questions/18215276/how-to-fill-rainbow-color-under-a-curve-in-python-matplotlib?lq=1
-def polygon(
-    ax: plt.axes, x1: float, y1: float, x2: float, y2: float, c: Union[Tuple, str]
-) -> None:
-    polygon = plt.Polygon([(x1, y1), (x2, y1), (x2, y2), (x1, y2)], color=c)
-    ax.add_patch(polygon)
+# Quantile matrix - every requested quantile of every time row in one vectorized ppf call.
+def quantile_matrix(location, scale, probs) -> np.ndarray:
+    """Returns a (len(probs), len(location)) array of normal quantiles."""
+    return stats.norm.ppf(
+        np.asarray(probs, dtype=float)[:, np.newaxis],
+        loc=np.asarray(location, dtype=float)[np.newaxis, :],
+        scale=np.asarray(scale, dtype=float)[np.newaxis, :],
+    )
 
 
 ##########################
@@ -39,37 +45,41 @@ def sierra_coloring(
     X: pd.core.series.Series,
     LCL: pd.core.series.Series,
     UCL: pd.core.series.Series,
-) -> None:
+) -> mcollections.PolyCollection:
+    """Colors the rectangle between LCL and UCL over each time interval [T_n, T_{n+1}) by UCL - X, from black (most
+    certain) to white (the largest difference), and adds a colorbar. Every rectangle is built from the columns at once
+    and drawn as one PolyCollection, whose colors the colormap maps from an array. Returns the collection."""
     gradient = "binary"
     cmap = plt.get_cmap(
         gradient
     )  # Get a color map that goes from Black -> White on interval [0.0, 1.0].
+    T, X, LCL, UCL = (np.asarray(c, dtype=float) for c in (T, X, LCL, UCL))
     diff = UCL - X  # Find the difference between UCL and LCL
     diff_max = np.max(diff)  # Find the maximum difference to map to pure white
-    N = float(LCL.size)  # Get total number of records for boundary checking
-
-    # enumerate(zip(...)) -> matches the 4 columns into tuples, and enumerate assigns them an in order number
-    # For-loop unpacks the numbering into its index and the combined tuple
-    for n, (step, net, lcl, ucl) in enumerate(
-        zip(T, diff, LCL, UCL)
-    ):  # match each LCL with its UCL to color on
-        c = cmap(net / diff_max)  # Get coloring inversely related to maximum
-        if n + 1 == N:
-            continue  # don't draw in too many rectangles
-        polygon(
-            ax, lcl, step, ucl, T[n + 1], c
-        )  # Call polygon helper function to go between lcl, T_n, ucl, T_{n+1}
-
-        # Iterates through all steps given by data.
+    norm = matplotlib.colors.Normalize(vmin=0, vmax=diff_max)
+
+    # One rectangle per interval, going between lcl, T_n, ucl, T_{n+1} (the last row starts no interval)
+    vertices = np.empty(shape=(max(T.size - 1, 0), 4, 2))
+    vertices[:, [0, 3], 0] = LCL[:-1, np.newaxis]
+    vertices[:, [1, 2], 0] = UCL[:-1, np.newaxis]
+    vertices[:, [0, 1], 1] = T[:-1, np.newaxis]
+    vertices[:, [2, 3], 1] = T[1:, np.newaxis]
+    # plt.Polygon(..., color=c) sets both the face and the edge of each rectangle, with the Patch default joins
+    collection = mcollections.PolyCollection(
+        vertices, array=diff[:-1], cmap=cmap, norm=norm, edgecolors="face", joinstyle="miter"
+    )
+    # Data limits straight from the vertices, as ax.add_patch updates them (the view is left to the caller)
+    ax.add_collection(collection, autolim=False)
+    ax.update_datalim(vertices.reshape(-1, 2))
+
     cbar = plt.colorbar(
-        plt.cm.ScalarMappable(
-            norm=matplotlib.colors.Normalize(vmin=0, vmax=diff_max), cmap=cmap
-        ),
+        plt.cm.ScalarMappable(norm=norm, cmap=cmap),
         ax=ax,
     )
     cbar.set_ticks([0, diff_max])
     cbar.set_ticklabels(["Less uncertain", "More uncertain"])
     # Issues thus far: this is embedded into earlier code (will need to come out)
+    return collection
 
 
 def sierra_plot(
@@ -85,6 +95,9 @@ def sierra_plot(
     treat_labs=("Treatment", "Placebo"),
     treat_labs_top=True,
     treat_labs_spacing="\t\t\t",
+    gradient_steps=500,
+    render="collection",
+    max_vertices=None,
 ):
     """Function to generate a twister plot from input data. Returns matplotlib axes which can have xlims and ylims
     set to the desired levels.
@@ -112,6 +125,15 @@ def sierra_plot(
         Whether to place the `treat_labs` at the top (True) or bottom (False). Defaults to True.
     treat_labs_spacing : str, optional
         Spacing to use between the treatment group names.
+    gradient_steps : int, optional
+        Number of quantile lines drawn on each side of the point estimate. Defaults to 500.
+    render : str, optional
+        "collection" draws every quantile line as one LineCollection from a single ppf call. "lines" draws one
+        Line2D per quantile, which is much slower to draw and save. Defaults to "collection".
+    max_vertices : int, optional
+        Most vertices per quantile line (4 per time row drawn). Longer step functions are thinned with
+        `step_geometry.decimate_steps`; every kept row takes the largest SD of the rows it stands for, so the outer
+        quantile lines still reach as far. Defaults to None (every row is drawn).
 
     Returns
     -------
@@ -133,7 +155,7 @@ def sierra_plot(
     # Initializing plot
     fig, ax = plt.subplots(figsize=(6, 8))  # fig_size is width by height
     # Place reference line at end
-    STEP = 500
+    STEP = gradient_steps
     # Prep data for plotting; p
     df = pd.DataFrame()
     df["time"] = data[yvar]
@@ -143,27 +165,47 @@ def sierra_plot(
 
     # Delete this - Naive
     df["step"] = (data[xvar] - data[ucl]) / STEP
+    if max_vertices is not None:
+        (t, x, _, sd) = decimate_steps(df["time"], df[xvar], df["sd"], df["sd"], max_vertices)
+        df = pd.DataFrame({"time": t, xvar: x, "sd": sd})
 
     # Get colormap to draw with
     gradient = "gist_yarg"
     cmap = plt.get_cmap(gradient)
-    # loop through as many steps as needed
-    for i in np.arange(start=0.05, stop=0.5, step=0.45 / STEP):
-        # Get PPF to arrange lines
-        df[i] = norm(loc=df[xvar], scale=df["sd"]).ppf(i)
-        ax.step(df[i], data[yvar].shift(-1).ffill(), color=cmap(i), where="post")
-
-    for i in np.arange(start=0.95, stop=0.5, step=-0.45 / STEP):
-        # Get PPF to arrange lines
-        df[i] = norm(loc=df[xvar], scale=df["sd"]).ppf(i)
-        ax.step(df[i], data[yvar].shift(-1).ffill(), color=cmap(1 - i), where="post")
+    lower_q = np.arange(start=0.05, stop=0.5, step=0.45 / STEP)
+    upper_q = np.arange(start=0.95, stop=0.5, step=-0.45 / STEP)
+    time = step_times(df["time"])  # Shifted once, shared by every line
+    if render == "collection":
+        # All quantiles at once, drawn in the same order (and colors) as the per-line loop below
+        quantiles = quantile_matrix(
+            df[xvar], df["sd"], np.concatenate([lower_q, upper_q])
+        )
+        ax.add_collection(
+            mcollections.LineCollection(
+                post_step_segments(quantiles, time),
+                colors=cmap(np.concatenate([lower_q, 1 - upper_q])),
+                capstyle="projecting",  # Match the Line2D defaults used by ax.step
+                joinstyle="round",
+            )
+        )
+    elif render == "lines":
+        # loop through as many steps as needed
+        for i in lower_q:
+            # Get PPF to arrange lines
+            df[i] = stats.norm(loc=df[xvar], scale=df["sd"]).ppf(i)
+            ax.step(df[i], time, color=cmap(i), where="post")
+
+        for i in upper_q:
+            # Get PPF to arrange lines
+            df[i] = stats.norm(loc=df[xvar], scale=df["sd"]).ppf(i)
+            ax.step(df[i], time, color=cmap(1 - i), where="post")
+    else:
+        raise ValueError("render must be either 'collection' or 'lines'")
     # Dummy way - can optimize later
     # Step function for Risk Difference
     ax.step(
-        data[xvar],  # Risk Difference column
-        data[yvar]
-        .shift(-1)
-        .ffill(),  # time column (shift is to make sure steps occur at correct t
+        df[xvar],  # Risk Difference column
+        time,  # time column (shift is to make sure steps occur at correct t
         # label="RD",  # Sets the label in the legend
         color="k",  # Sets the color of the line (k=black)
         # alpha=0.2, # Alpha for line as needed?
@@ -210,7 +252,7 @@ def sierra_plot(
     ax.set_ylabel(ylab)  # Sets the y-label
     if log_scale:
         ax.set_xscale("log")
-        xlimit = np.max(
+        xlimit = np.nanmax(
             [np.abs(np.log(data[lcl])), np.abs(np.log(data[ucl]))]
         )  # Extract the x-limits to use
         spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
@@ -218,7 +260,7 @@ def sierra_plot(
             [np.exp(-xlimit - spacing), np.exp(xlimit + spacing)]
         )  # Sets the min and max of the x-axis
     else:
-        xlimit = np.max(
+        xlimit = np.nanmax(
             [np.abs(data[lcl]), np.abs(data[ucl])]
         )  # Extract the x-limits to use
         spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
@@ -236,43 +278,50 @@ def sierra_plot(
 
 
 ##########################
-# Setup data
-# Reading in data
-data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
-# data.info()  # checking that it read in correctly
+# Example (python -m sierra_plots.sierra_plot_mwk, from the repository root)
+def main():
+    ##########################
+    # Setup data
+    # Reading in data
+    data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
+    # data.info()  # checking that it read in correctly
+
+    ##########################
+    # Example: Difference
+    ax = sierra_plot(
+        data,
+        xvar="RD",
+        lcl="RD_LCL",
+        ucl="RD_UCL",
+        yvar="t",
+        treat_labs=["Vaccine", "Placebo"],
+    )
 
-##########################
-# Example: Difference
-ax = sierra_plot(
-    data,
-    xvar="RD",
-    lcl="RD_LCL",
-    ucl="RD_UCL",
-    yvar="t",
-    treat_labs=["Vaccine", "Placebo"],
-)
-
-# Formatting the axes and labels
-ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-
-plt.tight_layout()  # Sets spacing of the border of the plot
-plt.savefig(
-    "sierra_plot_python.png", format="png", dpi=600
-)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
-
-# ##########################
-# # Example: Ratio
-# ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
-#                   reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
-
-# # Formatting the axes and labels
-# ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
-# ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-# ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
-# ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
-
-# plt.tight_layout()  # Sets spacing of the border of the plot
-# # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
-# plt.show()  # displays the generated image
+    # Formatting the axes and labels
+    ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    plt.savefig(
+        "sierra_plot_python.png", format="png", dpi=600
+    )  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
+
+    # ##########################
+    # # Example: Ratio
+    # ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
+    #                   reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
+
+    # # Formatting the axes and labels
+    # ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
+    # ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+    # ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
+    # ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
+
+    # plt.tight_layout()  # Sets spacing of the border of the plot
+    # # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
+    # plt.show()  # displays the generated image
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,16 @@
 ########################################################################################################################
 
 # Importing required dependencies
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-from scipy.stats import norm
+from __future__ import annotations
 
 from typing import Union, Tuple  # Import union, tuple type hinting
 
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+
 # TODO:
 # New approach: rectangles between midpoint and 95%, mid and 5%.
 # Fill with gradient (difficult to match with normal distribution?)
@@ -164,7 +166,7 @@ def sierra_plot(
     ax.set_ylabel(ylab)  # Sets the y-label
     if log_scale:
         ax.set_xscale("log")
-        xlimit = np.max(
+        xlimit = np.nanmax(
             [np.abs(np.log(data[lcl])), np.abs(np.log(data[ucl]))]
         )  # Extract the x-limits to use
         spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
@@ -172,7 +174,7 @@ def sierra_plot(
             [np.exp(-xlimit - spacing), np.exp(xlimit + spacing)]
         )  # Sets the min and max of the x-axis
     else:
-        xlimit = np.max(
+        xlimit = np.nanmax(
             [np.abs(data[lcl]), np.abs(data[ucl])]
         )  # Extract the x-limits to use
         spacing = xlimit * 2 / 20  # Sets a spacing factor. 20 seems to work well enough
@@ -190,43 +192,50 @@ def sierra_plot(
 
 
 ##########################
-# Setup data
-# Reading in data
-data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
-# data.info()  # checking that it read in correctly
+# Example (python -m sierra_plots.sierra_plot_rectangle, from the repository root)
+def main():
+    ##########################
+    # Setup data
+    # Reading in data
+    data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
+    # data.info()  # checking that it read in correctly
+
+    ##########################
+    # Example: Difference
+    ax = sierra_plot(
+        data,
+        xvar="RD",
+        lcl="RD_LCL",
+        ucl="RD_UCL",
+        yvar="t",
+        treat_labs=["Vaccine", "Placebo"],
+    )
 
-##########################
-# Example: Difference
-ax = sierra_plot(
-    data,
-    xvar="RD",
-    lcl="RD_LCL",
-    ucl="RD_UCL",
-    yvar="t",
-    treat_labs=["Vaccine", "Placebo"],
-)
-
-# Formatting the axes and labels
-ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-
-plt.tight_layout()  # Sets spacing of the border of the plot
-plt.savefig(
-    "sierra_plot_python.png", format="png", dpi=600
-)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
-
-# ##########################
-# # Example: Ratio
-# ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
-#                   reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
-
-# # Formatting the axes and labels
-# ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
-# ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-# ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
-# ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
-
-# plt.tight_layout()  # Sets spacing of the border of the plot
-# # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
-# plt.show()  # displays the generated image
+    # Formatting the axes and labels
+    ax.legend(loc="lower right")  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    plt.savefig(
+        "sierra_plot_python.png", format="png", dpi=600
+    )  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
+
+    # ##########################
+    # # Example: Ratio
+    # ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
+    #                   reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
+
+    # # Formatting the axes and labels
+    # ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
+    # ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+    # ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
+    # ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
+
+    # plt.tight_layout()  # Sets spacing of the border of the plot
+    # # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
+    # plt.show()  # displays the generated image
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+########################################################################################################################
+# Sierra / Twister Plots: step geometry
+#
+# Builds the vertices of 'post' step lines and step bands directly from numpy arrays, so the plots no longer recompute
+# `data[yvar].shift(-1).ffill()` for every line or let `fill_betweenx(..., step="post")` re-expand the steps for every
+# band. All bands of a plot are drawn as a single PolyCollection. `decimate_steps` thins very long step functions to a
+# vertex budget before any of this is built, and `step_raster_rows` lays out the rows of an image drawn over the steps.
+########################################################################################################################
+
+# Importing required dependencies
+from __future__ import annotations
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+mcollections = lazy_import("matplotlib.collections")
+mcolors = lazy_import("matplotlib.colors")
+
+
+##########################
+# Step times - what `data[yvar].shift(-1).ffill()` gives, without pandas.
+def step_times(time) -> np.ndarray:
+    """Times shifted back by one row and forward filled, the y-values the plots hand to ``ax.step(..., where="post")``
+    so that each step occurs at the correct t."""
+    time = np.asarray(time, dtype=float)
+    shifted = np.empty_like(time)
+    shifted[:-1] = time[1:]
+    shifted[-1:] = np.nan
+    # Forward fill: every missing value takes the last observed value before it
+    index = np.where(np.isnan(shifted), 0, np.arange(shifted.size))
+    np.maximum.accumulate(index, out=index)
+    return shifted[index]  # A missing first value has nothing before it and stays missing, as in pandas
+
+
+##########################
+# Step segments - the vertices ax.step(x, y, where="post") would draw, for every row of x at once.
+def post_step_segments(x: np.ndarray, y) -> np.ndarray:
+    """Expands each row of `x` (levels x time) against the shared `y` into 'post' step vertices. Returns a
+    (levels, 2 * time - 1, 2) array that can be handed straight to a LineCollection."""
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.asarray(y, dtype=float)
+    segments = np.empty(shape=(x.shape[0], 2 * x.shape[1] - 1, 2))
+    segments[:, 0::2, 0] = x
+    segments[:, 1::2, 0] = x[:, 1:]
+    segments[:, 0::2, 1] = y
+    segments[:, 1::2, 1] = y[:-1]
+    return segments
+
+
+##########################
+# Step bands - the polygons fill_betweenx(time, upper, lower, step="post") would draw, for every band at once.
+def post_step_polygons(time, lower, upper) -> tuple:
+    """Expands each row of `lower` and `upper` (levels x time) into the closed polygon fill_betweenx draws with
+    ``step="post"``: along the upper limit, then back along the lower limit. Rows with a missing time or limit split
+    a band into several polygons, as they do in fill_betweenx.
+
+    Returns
+    -------
+    The (4 * time, 2) vertices of each polygon, stacked in one (levels, 4 * time, 2) array when nothing is missing
+    (which PolyCollection turns into paths fastest), and the band (row) each polygon belongs to
+    """
+    time = np.asarray(time, dtype=float)
+    lower = np.atleast_2d(np.asarray(lower, dtype=float))
+    upper = np.atleast_2d(np.asarray(upper, dtype=float))
+    finite = np.isfinite(time) & np.isfinite(lower) & np.isfinite(upper)
+    if finite.all():  # Usual case: one polygon per band, all built at once
+        return _band_vertices(time, lower, upper), np.arange(lower.shape[0])
+
+    polygons, bands = [], []
+    for k, row in enumerate(finite):
+        # Start and stop of each run of complete rows
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], row.view(np.int8), [0]])))
+        for start, stop in zip(edges[0::2], edges[1::2]):
+            rows = slice(start, stop)
+            polygons.append(_band_vertices(time[rows], lower[k : k + 1, rows], upper[k : k + 1, rows])[0])
+            bands.append(k)
+    return polygons, np.asarray(bands, dtype=int)
+
+
+def _band_vertices(time: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """(levels, 4 * time, 2) polygon vertices for complete rows, in the vertex order of fill_betweenx."""
+    levels, n = upper.shape
+    m = 2 * n - 1  # Vertices of one step-expanded limit
+    t = np.empty(m)
+    t[0::2] = time
+    t[1::2] = time[1:]
+    vertices = np.empty(shape=(levels, 2 * m + 2, 2))
+    vertices[:, 0, 0] = lower[:, 0]  # Start on the lower limit
+    vertices[:, 1 : m + 1, 0][:, 0::2] = upper
+    vertices[:, 1 : m + 1, 0][:, 1::2] = upper[:, :-1]
+    vertices[:, m + 1, 0] = lower[:, -1]  # Cross over to the lower limit at the last time
+    vertices[:, m + 2 :, 0][:, ::-1][:, 0::2] = lower
+    vertices[:, m + 2 :, 0][:, ::-1][:, 1::2] = lower[:, :-1]
+    vertices[:, 0, 1] = time[0]
+    vertices[:, 1 : m + 1, 1] = t
+    vertices[:, m + 1, 1] = time[-1]
+    vertices[:, m + 2 :, 1] = t[::-1]
+    return vertices
+
+
+##########################
+# Raster rows - the pixel rows of an image drawn over 'post' steps.
+def step_raster_rows(time, rows: int) -> tuple:
+    """Centers of the rows of an image of a 'post' step function, drawn with nearest-center lookup (e.g. a
+    NonUniformImage), and the row of `time` each one shows. When there are at most `rows` / 2 steps, every step gets
+    two centers just inside its ends, so the image changes rows exactly at the times. Otherwise `rows` evenly spaced
+    centers each show the step they fall in.
+
+    Parameters
+    ----------
+    time : array-like
+        The time column, in increasing order.
+    rows : int
+        Most image rows.
+
+    Returns
+    -------
+    The increasing row centers and the index into `time` of each
+    """
+    time = np.asarray(time, dtype=float)
+    steps = np.flatnonzero(np.diff(time) > 0)  # Rows with a step of non-zero height; the last row has none
+    if 2 * steps.size <= rows:
+        inset = 1e-6 * (time[steps + 1] - time[steps])  # Lookup switches rows halfway between neighbouring centers
+        centers = np.column_stack([time[steps] + inset, time[steps + 1] - inset]).ravel()
+        return centers, np.repeat(steps, 2)
+    edges = np.linspace(time[0], time[-1], rows + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return centers, np.searchsorted(time, centers, side="right") - 1
+
+
+##########################
+# Decimation - at most a few rows per slice of time, with the extremes of every row that was dropped.
+def decimate_steps(time, estimate, lower, upper, max_vertices: int) -> tuple:
+    """Thins a step function and its bands so that each band polygon has at most `max_vertices` vertices (4 per row,
+    see `post_step_polygons`), and so does the step line. Rows are split into slices of equal time; each slice keeps
+    its first and last row and the rows where the estimate is smallest and largest, so the step line reaches every
+    extreme it did before, and each band takes the smallest lower and largest upper limit of its slice, so it covers
+    every interval it did before. With slices no taller than a pixel row, the result draws the same picture. Returns
+    the inputs unchanged when they are within the budget.
+
+    Parameters
+    ----------
+    time : array-like
+        The time column, in increasing order.
+    estimate : array-like
+        Point estimate of each row.
+    lower, upper : array-like
+        Lower and upper limits, one row per band (levels x time) or a single band.
+    max_vertices : int
+        Most vertices per band polygon or step line. At least 16.
+
+    Returns
+    -------
+    The time, estimate, lower and upper limits of the kept rows, shaped as given
+    """
+    time = np.asarray(time, dtype=float)
+    estimate = np.asarray(estimate, dtype=float)
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    if max_vertices < 16:
+        raise ValueError(f"max_vertices must be at least 16, got {max_vertices}")
+    slices = max_vertices // 16  # Up to 4 rows of 4 vertices each per slice
+    if 4 * time.size <= max_vertices:
+        return time, estimate, lower, upper
+    if np.any(np.diff(time) < 0):
+        raise ValueError("Decimating a step function needs the time column in increasing order")
+
+    edges = np.linspace(time[0], time[-1], slices + 1)
+    which = np.clip(np.searchsorted(edges, time, side="right") - 1, 0, slices - 1)
+    starts = np.flatnonzero(np.diff(which, prepend=-1))  # First row of every non-empty slice
+    ends = np.append(starts[1:], time.size) - 1
+    # Sorting by slice, then by estimate, puts each slice's smallest (largest) estimate at the slice's first row
+    smallest = np.lexsort((np.where(np.isnan(estimate), np.inf, estimate), which))[starts]
+    largest = np.lexsort((-np.where(np.isnan(estimate), -np.inf, estimate), which))[starts]
+    keep = np.unique(np.concatenate([starts, ends, smallest, largest]))
+
+    owner = np.searchsorted(starts, keep, side="right") - 1  # Slice of each kept row
+    envelope = []
+    for limits, reduce in ((lower, np.fmin), (upper, np.fmax)):
+        bounds = reduce.reduceat(np.atleast_2d(limits), starts, axis=1)[:, owner]
+        envelope.append(bounds if limits.ndim == 2 else bounds[0])
+    return time[keep], estimate[keep], envelope[0], envelope[1]
+
+
+##########################
+# Step band collection - every band of a plot as one artist.
+def step_band_collection(ax, time, lower, upper, colors, labels=None, **kwargs):
+    """Draws the 'post' step bands between each row of `lower` and `upper` on `ax` as a single PolyCollection, in row
+    order (so later rows are drawn on top). Looks the same as one ``fill_betweenx(..., step="post")`` call per row.
+
+    Parameters
+    ----------
+    ax : matplotlib axes
+        Axes to draw on.
+    time : array-like
+        The time column (no shift needed here).
+    lower, upper : array-like
+        Lower and upper limits, one row per band (levels x time) or a single band.
+    colors : color, list of colors
+        A color for every band, or one color shared by all of them.
+    labels : str, list of str, optional
+        Legend label of each band. The collection itself carries the first label; the remaining bands get empty
+        PolyCollections so that the legend keeps one entry per band.
+    **kwargs
+        Passed on to the PolyCollection, e.g. `alpha`.
+
+    Returns
+    -------
+    The PolyCollection holding every band
+    """
+    polygons, bands = post_step_polygons(time, lower, upper)
+    levels = np.atleast_2d(np.asarray(upper)).shape[0]
+    colors = _band_colors(colors, levels)
+    labels = [labels] if isinstance(labels, str) else labels
+
+    # fill_betweenx sets `color`, i.e. both the face and the edge of each band
+    collection = mcollections.PolyCollection(polygons, color=colors[bands], **kwargs)
+    proxies = []
+    if labels is not None:
+        if bands.size and bands[0] == 0:  # The legend takes the first face color, which is then the first band's
+            collection.set_label(labels[0])
+            labels = [None] + list(labels[1:])
+        proxies = [
+            mcollections.PolyCollection([], color=colors[k : k + 1], label=label, **kwargs)
+            for k, label in enumerate(labels)
+            if label is not None
+        ]
+    # Data limits straight from the limits; the default path-by-path extent scan costs more than building the bands
+    ax.add_collection(collection, autolim=False)
+    ax.update_datalim(_corners(time, lower, upper))
+    ax.autoscale_view()
+    for proxy in proxies:
+        ax.add_collection(proxy, autolim=False)
+    return collection
+
+
+def _corners(time, lower, upper) -> np.ndarray:
+    """Lower-left and upper-right corners of the bands, plus their smallest positive coordinates for log axes."""
+    x = np.concatenate([np.ravel(lower), np.ravel(upper)]).astype(float)
+    y = np.asarray(time, dtype=float)
+    corners = []
+    for values in (x, y):
+        values = values[np.isfinite(values)]
+        positive = values[values > 0]
+        if not values.size:
+            return np.empty(shape=(0, 2))
+        corners.append([values.min(), values.max(), positive.min() if positive.size else values.max()])
+    return np.transpose(corners)
+
+
+def _band_colors(colors, levels: int) -> np.ndarray:
+    """RGBA array with one row per band."""
+    colors = mcolors.to_rgba_array(colors)
+    return np.repeat(colors, levels, axis=0) if len(colors) == 1 else colors
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from sierra_plots import sierra_layout
+from sierra_plots.interval_cache import IntervalCache
+from sierra_plots.interval_distributions import INTERVAL_DISTRIBUTIONS, NormalInterval, register_interval_distribution
+
+
+class WideInterval(NormalInterval):
+    def __init__(self, location, scale):
+        super().__init__(location, 10 * np.asarray(scale, dtype=float))
+
+
+def _estimates():
+    t = np.arange(10, dtype=float)
+    rd = -0.001 * t
+    return pd.DataFrame({"t": t, "RD": rd, "RD_LCL": rd - 0.002, "RD_UCL": rd + 0.002})
+
+
+def _bands(interval_func, cache):
+    layout = sierra_layout(_estimates(), "RD", "RD_LCL", "RD_UCL", "t", interval_func=interval_func, cache=cache)
+    return layout.lower, layout.upper
+
+
+def test_reregistered_name_is_not_served_from_cache():
+    cache = IntervalCache()
+    try:
+        register_interval_distribution("test-reregistered", NormalInterval)
+        (lower, upper) = _bands("test-reregistered", cache)
+        register_interval_distribution("test-reregistered", WideInterval)
+        (wide_lower, wide_upper) = _bands("test-reregistered", cache)
+    finally:
+        INTERVAL_DISTRIBUTIONS.pop("test-reregistered", None)
+
+    assert not np.allclose(lower, wide_lower)
+    np.testing.assert_allclose(wide_lower, _bands(WideInterval, False)[0])
+    np.testing.assert_allclose(wide_upper, _bands(WideInterval, False)[1])
+    assert cache.hits == 0
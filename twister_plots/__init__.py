@@ -0,0 +1,8 @@
+"""Twister plots for time-to-event studies (Zivich, Cole & Breskin).
+
+``from twister_plots import twister_plot`` is cheap: numpy and matplotlib are imported the first time a plot is drawn.
+"""
+
+from .twister import twister_plot
+
+__all__ = ["twister_plot"]
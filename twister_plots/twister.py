@@ -5,15 +5,14 @@
 ########################################################################################################################
 
 # Importing required dependencies
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+# numpy and matplotlib are imported inside the functions so that importing twister_plot stays cheap
 
 
 ##########################
 # Twister Plot Function
 def twister_plot(data, xvar, lcl, ucl, yvar, xlab="Risk Difference", ylab="Days", log_scale=False, reference_line=0.0,
-                 treat_labs=("Treatment", "Placebo"), treat_labs_top=True, treat_labs_spacing="\t\t\t"):
+                 treat_labs=("Treatment", "Placebo"), treat_labs_top=True, treat_labs_spacing="\t\t\t", max_vertices=None,
+                 ax=None):
     """Function to generate a twister plot from input data. Returns matplotlib axes which can have xlims and ylims
     set to the desired levels.
 
@@ -40,6 +39,12 @@ def twister_plot(data, xvar, lcl, ucl, yvar, xlab="Risk Difference", ylab="Days"
         Whether to place the `treat_labs` at the top (True) or bottom (False). Defaults to True.
     treat_labs_spacing : str, optional
         Spacing to use between the treatment group names.
+    max_vertices : int, optional
+        Most vertices drawn for the confidence band and for the step line. Longer step functions are thinned with
+        `sierra_plots.step_geometry.decimate_steps`, which keeps their extremes and the interval envelope. Defaults to
+        None (every row is drawn).
+    ax : matplotlib axes, optional
+        Axes to draw on, e.g. a panel of `sierra_plots.grid.plot_grid`. Defaults to a new 5 x 7 figure.
 
     Returns
     -------
@@ -56,91 +61,160 @@ def twister_plot(data, xvar, lcl, ucl, yvar, xlab="Risk Difference", ylab="Days"
     >>> plt.show()  # displays the generated image
 
     """
+    import numpy as np
+    import matplotlib.pyplot as plt
+    plot_profiler, decimate_steps, step_times, step_band_collection = _step_tools()
+
     max_t = data[yvar].max()  # Extract max y value for the plot
+    profiler = plot_profiler("twister.twister_plot")  # No-op unless sierra_plots.profiling.profile_plots is active
+
+    time, estimate, lower, upper = data[yvar], data[xvar], data[lcl], data[ucl]
+    if max_vertices is not None:
+        with profiler.phase("decimate"):
+            time, estimate, lower, upper = decimate_steps(time, estimate, lower, upper, max_vertices)
 
     # Initializing plot
-    fig, ax = plt.subplots(figsize=(5, 7))  # fig_size is width by height
-    ax.vlines(reference_line, 0, max_t,
-              colors='gray',  # Sets color to gray for the reference line
-              linestyles='--',  # Sets the reference line as dashed
-              label=None)  # drawing dashed reference line at RD=0
+    profiler.figure = ax.figure if ax is not None else None
+    with profiler.phase("figure"):
+        if ax is None:
+            fig, ax = plt.subplots(figsize=(5, 7))  # fig_size is width by height
+        profiler.figure = ax.figure
+    with profiler.phase("reference"):
+        ax.vlines(reference_line, 0, max_t,
+                  colors='gray',  # Sets color to gray for the reference line
+                  linestyles='--',  # Sets the reference line as dashed
+                  label=None)  # drawing dashed reference line at RD=0
 
     # Step function for Risk Difference
-    ax.step(data[xvar],  # Risk Difference column
-            data[yvar].shift(-1).ffill(),  # time column (shift is to make sure steps occur at correct t
-            # label="RD",  # Sets the label in the legend
-            color='k',  # Sets the color of the line (k=black)
-            where='post')
-    # Shaded step function for Risk Difference confidence intervals
-    ax.fill_betweenx(data[yvar],  # time column (no shift needed here)
-                     data[ucl],  # upper confidence limit
-                     data[lcl],  # lower confidence limit
-                     label="95% CI",  # Sets the label in the legend
-                     color='k',  # Sets the color of the shaded region (k=black)
-                     alpha=0.2,  # Sets the transparency of the shaded region
-                     step='post')
-
-    ax2 = ax.twiny()  # Duplicate the x-axis to create a separate label
-    # "test \t test".expandtabs()
-    ax2.set_xlabel("Favors " + treat_labs[0] + treat_labs_spacing.expandtabs() +  # Manually create some custom spacing
-                   "Favors " + treat_labs[1],  # Top x-axes label for 'favors'
-                   fontdict={"size": 10})
-    ax2.set_xticks([])  # Removes top x-axes tick marks
-    # Option to add the 'favors' label below the first x-axes label
-    if not treat_labs_top:
-        ax2.xaxis.set_ticks_position('bottom')
-        ax2.xaxis.set_label_position('bottom')
-        ax2.spines['bottom'].set_position(('outward', 36))
-
-    ax.set_ylim([0, max_t])  # Sets the min and max of the y-axis
-    ax.set_ylabel(ylab)  # Sets the y-label
-    if log_scale:
-        ax.set_xscale("log")
-        xlimit = np.max([np.abs(np.log(data[lcl])),
-                         np.abs(np.log(data[ucl]))])  # Extract the x-limits to use
-        spacing = xlimit*2 / 20  # Sets a spacing factor. 20 seems to work well enough
-        ax.set_xlim([np.exp(-xlimit - spacing), np.exp(xlimit + spacing)])  # Sets the min and max of the x-axis
-    else:
-        xlimit = np.max([np.abs(data[lcl]), np.abs(data[ucl])])  # Extract the x-limits to use
-        spacing = xlimit*2 / 20  # Sets a spacing factor. 20 seems to work well enough
-        ax.set_xlim([-xlimit-spacing, xlimit+spacing])  # Sets the min and max of the x-axis
-
-    ax.set_xlabel(xlab,  # Sets the x-axis main label (bottom label)
-                  fontdict={"size": 11,  # "weight": "bold"
-                          #6eb46c  })
+    with profiler.phase("step_line"):
+        ax.step(estimate,  # Risk Difference column
+                step_times(time),  # time column (shift is to make sure steps occur at correct t
+                # label="RD",  # Sets the label in the legend
+                color='k',  # Sets the color of the line (k=black)
+                where='post')
+    # Shaded step function for Risk Difference confidence intervals (step vertices built once, see step_geometry)
+    with profiler.phase("bands"):
+        step_band_collection(ax,
+                             time,  # time column (no shift needed here)
+                             lower,  # lower confidence limit
+                             upper,  # upper confidence limit
+                             labels="95% CI",  # Sets the label in the legend
+                             colors='k',  # Sets the color of the shaded region (k=black)
+                             alpha=0.2)  # Sets the transparency of the shaded region
+
+    with profiler.phase("twin_axis"):
+        ax2 = ax.twiny()  # Duplicate the x-axis to create a separate label
+        # "test \t test".expandtabs()
+        ax2.set_xlabel("Favors " + treat_labs[0] +
+                       treat_labs_spacing.expandtabs() +  # Manually create some custom spacing
+                       "Favors " + treat_labs[1],  # Top x-axes label for 'favors'
+                       fontdict={"size": 10})
+        ax2.set_xticks([])  # Removes top x-axes tick marks
+        # Option to add the 'favors' label below the first x-axes label
+        if not treat_labs_top:
+            ax2.xaxis.set_ticks_position('bottom')
+            ax2.xaxis.set_label_position('bottom')
+            ax2.spines['bottom'].set_position(('outward', 36))
+
+    with profiler.phase("limits"):
+        ax.set_ylim([0, max_t])  # Sets the min and max of the y-axis
+        ax.set_ylabel(ylab)  # Sets the y-label
+        if log_scale:
+            ax.set_xscale("log")
+            xlimit = np.nanmax([np.abs(np.log(data[lcl])),
+                                np.abs(np.log(data[ucl]))])  # Extract the x-limits to use
+            spacing = xlimit*2 / 20  # Sets a spacing factor. 20 seems to work well enough
+            ax.set_xlim([np.exp(-xlimit - spacing), np.exp(xlimit + spacing)])  # Sets the min and max of the x-axis
+        else:
+            xlimit = np.nanmax([np.abs(data[lcl]), np.abs(data[ucl])])  # Extract the x-limits to use
+            spacing = xlimit*2 / 20  # Sets a spacing factor. 20 seems to work well enough
+            ax.set_xlim([-xlimit-spacing, xlimit+spacing])  # Sets the min and max of the x-axis
+
+        ax.set_xlabel(xlab,  # Sets the x-axis main label (bottom label)
+                      fontdict={"size": 11,  # "weight": "bold"
+                                })
     return ax
 
 
 ##########################
-# Setup data
-# Reading in data
-data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
-# data.info()  # checking that it read in correctly
+# Step tools - the shared sierra_plots step geometry, or the original pandas step code when this file runs on its own
+def _step_tools():
+    """Returns `plot_profiler`, `decimate_steps`, `step_times` and `step_band_collection` from `sierra_plots`. When
+    twister.py is run as a standalone script (``python twister_plots/twister.py``) and `sierra_plots` cannot be
+    imported, returns stand-ins that draw with the original pandas step code and do not profile."""
+    try:
+        from sierra_plots.profiling import plot_profiler
+        from sierra_plots.step_geometry import decimate_steps, step_times, step_band_collection
+    except ImportError:
+        return _NoProfiler, _no_decimate_steps, _pandas_step_times, _fill_betweenx_band
+    return plot_profiler, decimate_steps, step_times, step_band_collection
+
+
+class _NoProfiler:
+    """Stand-in for `sierra_plots.profiling.plot_profiler`: every phase is a no-op."""
+
+    def __init__(self, plot):
+        self.figure = None
+
+    def phase(self, name):
+        import contextlib
+        return contextlib.nullcontext()
+
+
+def _no_decimate_steps(time, estimate, lower, upper, max_vertices):
+    raise ImportError("max_vertices needs the sierra_plots package; run from the repository root with "
+                      "python -m twister_plots.twister")
+
+
+def _pandas_step_times(time):
+    return time.shift(-1).ffill()
 
-##########################
-# Example: Difference
-ax = twister_plot(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t",
-                  treat_labs=["Vaccine", "Placebo"])
 
-# Formatting the axes and labels
-ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+def _fill_betweenx_band(ax, time, lower, upper, labels=None, colors=None, **kwargs):
+    return ax.fill_betweenx(time, upper, lower, label=labels, color=colors, step='post', **kwargs)
 
-plt.tight_layout()  # Sets spacing of the border of the plot
-# plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
 
 ##########################
-# Example: Ratio
-ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
-                  reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
-
-# Formatting the axes and labels
-ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
-ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
-ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
-ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
-
-plt.tight_layout()  # Sets spacing of the border of the plot
-# plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
-plt.show()  # displays the generated image
+# Example (python -m twister_plots.twister or python twister_plots/twister.py, from the repository root; see
+# sierra_plots/batch_plots.py for batches)
+def main():
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    ##########################
+    # Setup data
+    # Reading in data
+    data = pd.read_csv("data_twister.csv")  # .csv read in and managed using pandas
+    # data.info()  # checking that it read in correctly
+
+    ##########################
+    # Example: Difference
+    ax = twister_plot(data, xvar="RD", lcl="RD_LCL", ucl="RD_UCL", yvar="t",
+                      treat_labs=["Vaccine", "Placebo"])
+
+    # Formatting the axes and labels
+    ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
+
+    ##########################
+    # Example: Ratio
+    ax = twister_plot(data, xvar="RR", lcl="RR_LCL", ucl="RR_UCL", yvar="t",
+                      reference_line=1.0, log_scale=True, treat_labs=["Vaccine", "Placebo"])
+
+    # Formatting the axes and labels
+    ax.legend(loc='lower right')  # Added legend to the lower right corner of the plot
+    ax.set_yticks([i for i in range(0, 113, 7)])  # Sets the y-axes tick marks
+    ax.set_xticks([0.1, 0.25, 1, 5, 10])  # Sets the x-axes tick marks
+    ax.set_xticklabels(["0.10", "0.25", "1", "5", "10"])
+
+    plt.tight_layout()  # Sets spacing of the border of the plot
+    # plt.savefig("twister_plot_python.png", format='png', dpi=600)  # Saves the generated figure as .png
+    plt.show()  # displays the generated image
+
+
+if __name__ == "__main__":
+    main()